@@ -0,0 +1,195 @@
+"""Stress scenarios for the game loop subsystems, built programmatically on a headless Game.
+
+Run from the repository root:
+
+    python benchmarks/scenarios.py [--scenario NAME ...] [--frames N] [--output results.json]
+                                   [--baseline benchmarks/baseline.json] [--save-baseline] [--threshold 0.15]
+
+Every update and render phase of Game is timed separately. Results are percentiles in milliseconds
+plus per-frame allocation peaks, and the run exits with status 1 when a p95 regresses past the
+threshold relative to the baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import pygame
+
+from game import Game
+from scripts.entities import Enemy
+from scripts.particle import Particle
+from scripts.profiler import percentiles
+
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+# phases faster than this at p95 are too noisy to gate on
+MIN_GATED_MS = 0.05
+
+def add_row(game, x0, x1, y, tile_type='grass', variant=1):
+    for x in range(x0, x1):
+        game.tilemap.set_tile(str(x) + ';' + str(y), {'type': tile_type, 'variant': variant, 'pos': [x, y]})
+
+def empty_level(game, floor_width=64):
+    """Replace the loaded level with a flat floor, the player on it and one idle enemy far away.
+
+    The distant enemy keeps the level from counting as cleared.
+    """
+    game.tilemap.tilemap = {}
+    game.tilemap.offgrid_tiles = []
+    game.tilemap.invalidate()
+    game.emitters.set_areas([])
+    game.projectiles = []
+    game.particles = []
+    game.sparks = []
+    add_row(game, 0, floor_width, 10)
+    game.player.pos = [32, 10 * 16 - 15]
+    game.player.last_pos = list(game.player.pos)
+    game.player.velocity = [0, 0]
+
+    add_row(game, -1000, -990, -1000)
+    game.enemies = [Enemy(game, (-995 * 16, -1000 * 16 - 15), (8, 15))]
+    game.transition = 0
+    game.scroll = [game.player.pos[0] - 160, game.player.pos[1] - 120]
+    game.last_scroll = list(game.scroll)
+
+def setup_tilemap(game):
+    empty_level(game)
+    for y in range(10, 210):
+        add_row(game, -250, 250, y, tile_type='stone', variant=8)
+
+def setup_enemies(game):
+    empty_level(game, floor_width=1200)
+    for i in range(1000):
+        game.enemies.append(Enemy(game, (16 + i * 18, 10 * 16 - 15 - 64), (8, 15)))
+
+def fill_particles(game, count=10000):
+    while len(game.particles) < count:
+        pos = (game.player.pos[0] + game.fx_rng.random() * 640 - 320, game.player.pos[1] + game.fx_rng.random() * 480 - 240)
+        velocity = [game.fx_rng.random() - 0.5, game.fx_rng.random() - 0.5]
+        game.particles.append(Particle(game, 'particle', pos, velocity=velocity, frame=game.fx_rng.randint(0, 7)))
+
+def fill_projectiles(game, count=2000):
+    while len(game.projectiles) < count:
+        direction = 1.5 if game.fx_rng.random() < 0.5 else -1.5
+        pos = [game.player.pos[0] + game.fx_rng.random() * 640 - 320, game.player.pos[1] - 40 - game.fx_rng.random() * 100]
+        game.projectiles.append([pos, direction, game.fx_rng.randint(0, 300)])
+
+SCENARIOS = {
+    # name: (setup, called before every frame or None)
+    'tilemap_100k': (setup_tilemap, None),
+    'enemies_1000': (setup_enemies, None),
+    'particles_10k': (empty_level, fill_particles),
+    'projectile_storm': (empty_level, fill_projectiles),
+}
+
+def timed_frame(game, times):
+    game.profiler.begin_frame()
+    game.update()
+    game.render()
+    game.profiler.end_frame()
+    for name, ms in game.profiler.frames[-1].items():
+        times.setdefault(name, []).append(ms)
+
+def run_scenario(game, name, frames, warmup, alloc_frames):
+    setup, per_frame = SCENARIOS[name]
+    game.load_level(0)
+    setup(game)
+
+    times = {}
+    for i in range(warmup + frames):
+        if per_frame:
+            per_frame(game)
+        timed_frame(game, times if i >= warmup else {})
+
+    # allocation tracking slows everything down, so it gets its own pass
+    alloc_peaks = []
+    tracemalloc.start()
+    for i in range(alloc_frames):
+        if per_frame:
+            per_frame(game)
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        timed_frame(game, {})
+        alloc_peaks.append((tracemalloc.get_traced_memory()[1] - current) / 1024)
+    tracemalloc.stop()
+
+    return {
+        'frames': frames,
+        'frame_ms': percentiles(times.pop('frame')),
+        'phases_ms': {phase: percentiles(samples) for phase, samples in sorted(times.items())},
+        'alloc_peak_kb': percentiles(alloc_peaks) if alloc_peaks else None,
+        'counts': {'tiles': len(game.tilemap.tilemap), 'enemies': len(game.enemies), 'projectiles': len(game.projectiles),
+                   'particles': len(game.particles), 'sparks': len(game.sparks), 'culled': dict(game.camera.culled)},
+    }
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, result in results['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base:
+            continue
+        pairs = [('frame', result['frame_ms'], base['frame_ms'])]
+        pairs += [(phase, stats, base['phases_ms'][phase]) for phase, stats in result['phases_ms'].items() if phase in base['phases_ms']]
+        for phase, stats, base_stats in pairs:
+            if base_stats['p95'] < MIN_GATED_MS:
+                continue
+            change = stats['p95'] / base_stats['p95'] - 1
+            if change > threshold:
+                regressions.append('%s %s p95 %.3f ms -> %.3f ms (+%.0f%%)' % (name, phase, base_stats['p95'], stats['p95'], change * 100))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark game loop subsystems under stress scenarios.')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), help='scenario to run (default: all)')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=30)
+    parser.add_argument('--alloc-frames', type=int, default=30)
+    parser.add_argument('--output', metavar='PATH', help='write results as JSON')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.15, help='allowed relative p95 regression')
+    args = parser.parse_args()
+
+    game = Game(headless=True, seed=1, profile=True)
+    results = {
+        'meta': {'python': platform.python_version(), 'pygame': pygame.version.ver, 'platform': platform.platform(),
+                 'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'scenarios': {},
+    }
+    for name in args.scenario or sorted(SCENARIOS):
+        result = run_scenario(game, name, args.frames, args.warmup, args.alloc_frames)
+        results['scenarios'][name] = result
+        print('%-18s frame p50 %7.2f ms  p95 %7.2f ms  p99 %7.2f ms  alloc peak %8.1f KB'
+              % (name, result['frame_ms']['p50'], result['frame_ms']['p95'], result['frame_ms']['p99'],
+                 result['alloc_peak_kb']['max'] if result['alloc_peak_kb'] else 0))
+        slowest = sorted(result['phases_ms'].items(), key=lambda item: -item[1]['p95'])[:3]
+        print('    slowest: ' + ', '.join('%s %.2f ms' % (phase, stats['p95']) for phase, stats in slowest))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print('saved baseline to ' + args.baseline)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print('regressions against ' + args.baseline + ':')
+            for regression in regressions:
+                print('  ' + regression)
+            sys.exit(1)
+        print('no regressions against ' + args.baseline)
+
+if __name__ == '__main__':
+    main()
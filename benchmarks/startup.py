@@ -0,0 +1,81 @@
+"""Cold-start benchmark: launches the game until its first gameplay frame and checks the startup budget.
+
+Run from the repository root:
+
+    python benchmarks/startup.py --runs 5 [--cold] [--headless]
+
+Exits with status 1 when the median of any budgeted phase exceeds benchmarks/budget.json.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_PATH = os.path.join(ROOT, 'benchmarks', 'budget.json')
+
+def run_once(report_path, cold=False, headless=False):
+    if cold:
+        shutil.rmtree(os.path.join(ROOT, '.cache'), ignore_errors=True)
+    env = dict(os.environ)
+    if headless:
+        env['SDL_VIDEODRIVER'] = 'dummy'
+        env['SDL_AUDIODRIVER'] = 'dummy'
+    start = time.perf_counter()
+    subprocess.run([sys.executable, 'game.py', '--skip-title', '--quit-after-startup', '--startup-report', report_path],
+                   cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    process_ms = (time.perf_counter() - start) * 1000
+    with open(report_path, 'r') as f:
+        report = json.load(f)
+    report['process_ms'] = process_ms
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure game startup against the configured budget.')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--cold', action='store_true', help='delete the decoded-image cache before every run')
+    parser.add_argument('--headless', action='store_true', help='use SDL dummy video and audio drivers')
+    parser.add_argument('--budget', default=BUDGET_PATH)
+    parser.add_argument('--output', metavar='PATH', help='write the collected reports and medians as JSON')
+    args = parser.parse_args()
+
+    with open(args.budget, 'r') as f:
+        budget = json.load(f)['startup']
+
+    reports = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.runs):
+            reports.append(run_once(os.path.join(tmp, 'startup_' + str(i) + '.json'), cold=args.cold, headless=args.headless))
+
+    medians = {'wall_ms': statistics.median(r['wall_ms'] for r in reports),
+               'process_ms': statistics.median(r['process_ms'] for r in reports),
+               'phases_ms': {}}
+    for phase in sorted({name for r in reports for name in r['phases_ms']}):
+        medians['phases_ms'][phase] = statistics.median(r['phases_ms'].get(phase, 0) for r in reports)
+
+    failures = []
+    if medians['wall_ms'] > budget['wall_ms']:
+        failures.append('wall_ms %.1f > %.1f' % (medians['wall_ms'], budget['wall_ms']))
+    for phase, limit in budget.get('phases_ms', {}).items():
+        if medians['phases_ms'].get(phase, 0) > limit:
+            failures.append('%s %.1f > %.1f' % (phase, medians['phases_ms'][phase], limit))
+
+    print('startup (median of %d): %.1f ms in game, %.1f ms process' % (args.runs, medians['wall_ms'], medians['process_ms']))
+    for phase, ms in sorted(medians['phases_ms'].items(), key=lambda item: -item[1]):
+        print('  %-16s %8.2f ms' % (phase, ms))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'medians': medians, 'runs': reports, 'failures': failures}, f, indent=2)
+
+    if failures:
+        print('over budget: ' + ', '.join(failures))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
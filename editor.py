@@ -2,7 +2,9 @@ import sys
 
 import pygame
 
-from scripts.utils import load_images
+from scripts.assets import AssetPipeline
+from scripts.autosave import MapSaver
+from scripts.utils import make_surface, SURFACE_OPAQUE
 from scripts.tilemap import Tilemap
 
 RENDER_SCALE = 2.0
@@ -11,19 +13,23 @@ class Editor:
     def __init__(self):
         pygame.init()
 
-        pygame.display.set_caption("editor")
+        self.caption = "editor"
+        pygame.display.set_caption(self.caption)
         self.screen = pygame.display.set_mode((640, 480))
-        self.display = pygame.Surface((320, 240))
+        self.display = make_surface((320, 240), SURFACE_OPAQUE)
 
         self.clock = pygame.time.Clock()
         
+        pipeline = AssetPipeline()
+        pipeline.prefetch(['tiles'])
         self.assets = {
-            'decor': load_images('tiles/decor'),
-            'grass': load_images('tiles/grass'),
-            'large_decor': load_images('tiles/large_decor'),
-            'stone': load_images('tiles/stone'),
-            'spawners': load_images('tiles/dspawners'),
+            'decor': pipeline.images('tiles/decor'),
+            'grass': pipeline.images('tiles/grass'),
+            'large_decor': pipeline.images('tiles/large_decor'),
+            'stone': pipeline.images('tiles/stone'),
+            'spawners': pipeline.images('tiles/spawners'),
         }
+        pipeline.close()
         
         self.movement = [False, False, False, False]
         
@@ -33,6 +39,10 @@ class Editor:
             self.tilemap.load('map.json')
         except FileNotFoundError:
             pass
+        self.saver = MapSaver(self.tilemap, 'map.json')
+        recovered = self.saver.recover()
+        if recovered:
+            print('recovered %d unsaved edits from %s' % (recovered, self.saver.journal_path))
         
         self.scroll = [0, 0]
         
@@ -44,6 +54,36 @@ class Editor:
         self.right_clicking = False
         self.shift = False
         self.ongrid = True
+
+    def set_tile(self, tile_pos):
+        loc = str(tile_pos[0]) + ';' + str(tile_pos[1])
+        tile = {'type': self.tile_list[self.tile_group], 'variant': self.tile_variant, 'pos': list(tile_pos)}
+        # held clicks repaint the same tile every frame; only real changes are journaled
+        if self.tilemap.tilemap.get(loc) != tile:
+            self.tilemap.tilemap[loc] = tile
+            self.saver.record({'op': 'set', 'loc': loc, 'tile': tile})
+
+    def remove_tile(self, tile_pos):
+        loc = str(tile_pos[0]) + ';' + str(tile_pos[1])
+        if loc in self.tilemap.tilemap:
+            del self.tilemap.tilemap[loc]
+            self.saver.record({'op': 'remove', 'loc': loc})
+
+    def show_save_error(self):
+        # the saver writes on its own thread; a failed write only shows up here
+        caption = 'editor - save failed: %s' % self.saver.error if self.saver.error else 'editor'
+        if caption != self.caption:
+            self.caption = caption
+            pygame.display.set_caption(caption)
+            if self.saver.error:
+                print('saving %s failed: %s' % (self.saver.path, self.saver.error))
+
+    def quit(self):
+        self.saver.close()
+        if self.saver.error:
+            print('saving %s failed, unsaved edits are kept in %s: %s' % (self.saver.path, self.saver.journal_path, self.saver.error))
+        pygame.quit()
+        sys.exit()
         
     def run(self):
         while True:
@@ -71,29 +111,28 @@ class Editor:
                 self.display.blit(current_tile_img, mpos)
             
             if self.clicking and self.ongrid:               
-                self.tilemap.tilemap[str(tile_pos[0]) + ';' + str(tile_pos[1])] = {'type': self.tile_list[self.tile_group], 'variant': self.tile_variant, 'pos': tile_pos}
+                self.set_tile(tile_pos)
             if self.right_clicking:
-                tile_loc = str(tile_pos[0]) + ';' + str(tile_pos[1])
-                if tile_loc in self.tilemap.tilemap:
-                    del self.tilemap.tilemap[tile_loc]
+                self.remove_tile(tile_pos)
                 for tile in self.tilemap.offgrid_tiles.copy():
                     tile_img = self.assets[tile['type']][tile['variant']]
                     tile_r = pygame.Rect(tile['pos'][0] - self.scroll[0], tile['pos'][1] - self.scroll[1], tile_img.get_width(), tile_img.get_height())
                     if tile_r.collidepoint(mpos):
                         self.tilemap.offgrid_tiles.remove(tile)
+                        self.saver.record({'op': 'remove_offgrid', 'tile': tile})
             
             self.display.blit(current_tile_img, (5, 5))
                   
             
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    pygame.quit()
-                    exit()
+                    self.quit()
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     if event.button == 1:
                         self.clicking = True
                         if not self.ongrid:
                             self.tilemap.offgrid_tiles.append({'type': self.tile_list[self.tile_group], 'variant': self.tile_variant, 'pos': (mpos[0] + self.scroll[0], mpos[1] + self.scroll[1])})
+                            self.saver.record({'op': 'add_offgrid', 'tile': self.tilemap.offgrid_tiles[-1]})
                     if event.button == 3:
                         self.right_clicking = True
                     if self.shift:    
@@ -128,8 +167,9 @@ class Editor:
                         self.ongrid = not self.ongrid 
                     if event.key == pygame.K_t:
                         self.tilemap.autotile()
+                        self.saver.record({'op': 'autotile'})
                     if event.key == pygame.K_o: 
-                        self.tilemap.save('map.json')
+                        self.saver.save()
                     if event.key == pygame.K_LSHIFT: 
                         self.shift = True   
                     
@@ -145,6 +185,9 @@ class Editor:
                     if event.key == pygame.K_LSHIFT: 
                         self.shift = False
             
+            self.saver.update()
+            self.show_save_error()
+            
             self.screen.blit(pygame.transform.scale(self.display, self.screen.get_size()), (0, 0))
             pygame.display.update()
             self.clock.tick(60)           
@@ -1,3 +1,8 @@
+import time
+START_TIME = time.perf_counter()
+
+import argparse
+import hashlib
 import sys
 import random
 import math
@@ -5,22 +10,95 @@ import os
 
 import pygame
 
-from scripts.utils import load_image, load_images, Animation
-from scripts.entities import PhysicsEntity, Player, Enemy
+from scripts.tracer import StartupTracer
+from scripts.profiler import FrameProfiler
+from scripts.quality import QualityGovernor
+from scripts.presenter import Presenter
+from scripts.capture import FrameCapture
+from scripts.telemetry import Telemetry
+from scripts.text import TextCache
+from scripts.menu import Menu
+from scripts.hotreload import HotReloader
+from scripts.replay import Recorder, Replay
+from scripts.snapshot import LevelSnapshot
+from scripts.assets import LazyAssets
+from scripts.audio import Audio
+from scripts.utils import load_images, Animation, make_surface, SURFACE_OPAQUE, SURFACE_ALPHA
+from scripts.entities import PhysicsEntity, Player
 from scripts.tilemap import Tilemap
 from scripts.clouds import Clouds
-from scripts.particle import Particle
+from scripts.camera import Camera
+from scripts.emitters import Emitters, area_errors
 from scripts.spark import Spark
 
+FIXED_DT = 1 / 60
+MAX_CATCHUP_STEPS = 5
 
-class Game:
-    def __init__(self):
-        pygame.init()
 
-        pygame.display.set_caption("Platformia")
-        self.screen = pygame.display.set_mode((640, 480))
-        self.display = pygame.Surface((320, 240), pygame.SRCALPHA)
-        self.display_2 = pygame.Surface((320, 240))
+class Game:
+    def __init__(self, tracer=None, skip_title=False, startup_report=None, quit_after_startup=False, max_fps=None, headless=False,
+                 level=0, seed=None, record=None, replay=None, speed=1.0, profile=False, profile_csv=None,
+                 quality='auto', threaded_present=False, capture=None, telemetry=None, hot_reload=False, frame_budget=None):
+        self.tracer = tracer or StartupTracer()
+        self.skip_title = skip_title
+        self.startup_report = startup_report
+        self.quit_after_startup = quit_after_startup
+        # headless games have no window or audio and are driven by simulate() instead of run()
+        self.headless = headless
+
+        # all simulation randomness comes from these, so a seed plus the per-step inputs reproduce a session exactly;
+        # cosmetic spawns draw from fx_rng so they never shift the gameplay stream
+        if replay:
+            seed = replay.seed
+            level = replay.level
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.fx_rng = random.Random('fx:' + str(self.seed))
+        self.replay = replay
+        self.replay_frame = 0
+        self.record_path = record
+        self.recorder = Recorder(self.seed, level) if record else None
+        self.speed = speed
+        self.pending_jump = False
+        self.pending_dash = False
+        # phase timings per frame; F3 toggles the overlay, F4 exports the history
+        self.profiler = FrameProfiler(enabled=profile or bool(profile_csv))
+        self.profiler.visible = profile
+        self.profile_csv = profile_csv
+
+        with self.tracer.span('pygame.init'):
+            if headless:
+                os.environ['SDL_VIDEODRIVER'] = 'dummy'
+                pygame.display.init()
+                pygame.font.init()
+            else:
+                pygame.init()
+
+        with self.tracer.span('display'):
+            pygame.display.set_caption("Platformia")
+            self.screen = pygame.display.set_mode((1, 1) if headless else (640, 480))
+            self.display = make_surface((320, 240), SURFACE_ALPHA)
+            self.display_2 = make_surface((320, 240), SURFACE_OPAQUE)
+            self.camera = Camera(self.display.get_size())
+            # the scale-and-flip can run on its own thread, overlapping the next frame's simulation
+            self.presenter = Presenter(self.screen, self.display_2.get_size(), threaded=threaded_present and not headless)
+            # records the 320x240 frames before upscaling; F5 starts and stops a capture
+            self.capture = FrameCapture(capture, self.display_2.get_size()) if capture and not headless else None
+            # render at the display's refresh rate where pygame can report it; the simulation always steps at 1 / FIXED_DT
+            refresh_rate = getattr(pygame.display, 'get_current_refresh_rate', lambda: 0)()
+            self.max_fps = max_fps if max_fps is not None else (refresh_rate or 60)
+
+        # the budget is one simulation step, not one frame at the render cap: a 144 Hz display must not push a machine
+        # that holds 60 FPS down to minimum quality
+        self.frame_budget = frame_budget or FIXED_DT * 1000
+        # cosmetic load follows the frame budget in a window; headless runs keep full quality so their work is comparable
+        adaptive = quality == 'auto' and not headless
+        self.quality = QualityGovernor(budget_ms=self.frame_budget, level='high' if quality == 'auto' else quality,
+                                       adaptive=adaptive)
+        self.shake_offset = (0, 0)
+        self.render_frame = 0
+        # per-second JSON lines of frame times, hot-path counters and live entity counts
+        self.telemetry = Telemetry(telemetry, budget_ms=self.frame_budget) if telemetry else None
 
         self.clock = pygame.time.Clock()
         self.movement = [False, False]
@@ -28,49 +106,55 @@ class Game:
         
         self.menu_open = False   
         self.menu_selected = 0   
-
-        self.assets = {
-            'decor': load_images('tiles/decor'),
-            'grass': load_images('tiles/grass'),
-            'large_decor': load_images('tiles/large_decor'),
-            'stone': load_images('tiles/stone'),
-            'player': load_image('entities/player.png'),
-            'background': load_image('UPDATED-BACKGROUND3.png'),
-            'clouds': load_images('clouds'),
-            'game_over': load_image('GAME-OVER.png'),
-            'you_win': load_image('YOU-WIN.png'),
-            'enemy/idle': Animation(load_images('entities/enemy/idle'), img_dur=6),
-            'enemy/run': Animation(load_images('entities/enemy/run'), img_dur=4),
-            'player/idle': Animation(load_images('entities/player/idle'), img_dur=6),
-            'player/run': Animation(load_images('entities/player/run'), img_dur=4),
-            'player/jump': Animation(load_images('entities/player/jump')),
-            'player/slide': Animation(load_images('entities/player/slide')),
-            'player/wall_slide': Animation(load_images('entities/player/wall_slide')),
-            'particles/leaf': Animation(load_images('particles/leaf'), img_dur=20, loop=False),
-            'particles/particle': Animation(load_images('particles/particle'), img_dur=6, loop=False),
-            'gun': load_image('gun.png'),
-            'projectile': load_image('projectile.png'),
-            
-            'pause_resume': load_image('resume.png'),
-            'pause_quit': load_image('quit.png'),
-            'pause': load_image('pause.png'),
+        # every string drawn outside the profiler goes through the text cache
+        self.text = TextCache()
+
+        sfx_paths = {
+            'jump': 'data/sfx/jump.wav',
+            'dash': 'data/sfx/dash.wav',
+            'hit': 'data/sfx/hit.wav',
+            'shoot': 'data/sfx/shoot.wav',
+            'ambience': 'data/sfx/ambience.wav',
         }
 
-        self.sfx = {
-            'jump': pygame.mixer.Sound('data/sfx/jump.wav'),
-            'dash': pygame.mixer.Sound('data/sfx/dash.wav'),
-            'hit': pygame.mixer.Sound('data/sfx/hit.wav'),
-            'shoot': pygame.mixer.Sound('data/sfx/shoot.wav'),
-            'ambience': pygame.mixer.Sound('data/sfx/ambience.wav'),
-        }
-
-        self.sfx['ambience'].set_volume(0.2)
-        self.sfx['shoot'].set_volume(0.4)
-        self.sfx['hit'].set_volume(0.8)
-        self.sfx['dash'].set_volume(0.3)
-        self.sfx['jump'].set_volume(0.7)
+        self.assets = LazyAssets(target=self.display, tracer=self.tracer)
+        if headless:
+            sfx_paths = {}
+        self.assets.pipeline.prefetch_sounds(sfx_paths.values())
+        self.assets.prefetch('player', 'level')
+        # menu screens, the pause menu included, come from menu_config.json
+        self.menu = Menu(self)
+        with self.tracer.span('audio'):
+            self.sfx = self.assets.pipeline.sounds(sfx_paths)
+            self.audio = Audio(self.sfx)
+
+        self.clouds = Clouds(self.assets['clouds'], count=16, rng=self.fx_rng)
+
+        # named stages of one simulation step and one rendered frame, in order; benchmarks and profiling time each
+        self.update_phases = [
+            ('world', self.update_world),
+            ('emitters', self.update_emitters),
+            ('clouds', self.clouds.update),
+            ('enemies', self.update_enemies),
+            ('player', self.update_player),
+            ('projectiles', self.update_projectiles),
+            ('sparks', self.update_sparks),
+            ('particles', self.update_particles),
+        ]
+        self.render_phases = [
+            ('background', self.render_background),
+            ('tilemap', self.render_tilemap),
+            ('entities', self.render_entities),
+            ('projectiles', self.render_projectiles),
+            ('sparks', self.render_sparks),
+            ('outline', self.render_outline),
+            ('particles', self.render_particles),
+            ('hud', self.render_hud),
+        ]
 
-        self.clouds = Clouds(self.assets['clouds'], count=16)
+        self.particles = []
+        self.sparks = []
+        self.emitters = Emitters(self)
 
         self.player = Player(self, (50, 50), (8, 15))
         self.player.health = 3
@@ -81,15 +165,27 @@ class Game:
         
         self.heart_full, self.heart_empty = self._create_heart_images(size=14)
 
-        self.level = 0
-        self.load_level(self.level)
-
+        self.level = level
+        self.level_snapshots = {}
+        self.loaded_level = None
         self.screenshake = 0
+        self.deaths = 0
+        self.completed = False
+
+        # decode what the starting level uses while the title is up: its tile types, and the enemies if it has any
+        snapshot = self.level_snapshots[level] = self.parse_level(level)
+        self.assets.prefetch_names(*snapshot.used_tile_types())
+        if snapshot.enemy_spawns:
+            self.assets.prefetch('enemy')
+        if not skip_title:
+            self.menu.prefetch('title')
+        # watches data/maps and data/images and applies edits to the running game
+        self.reloader = HotReloader(self) if hot_reload else None
 
     def _create_heart_images(self, size=14):
         """Create smoother, more stylized heart icons (full and empty)."""
-        surf_full = pygame.Surface((size, size), pygame.SRCALPHA)
-        surf_empty = pygame.Surface((size, size), pygame.SRCALPHA)
+        surf_full = make_surface((size, size), SURFACE_ALPHA)
+        surf_empty = make_surface((size, size), SURFACE_ALPHA)
         center = size // 2
         radius = size // 4
 
@@ -127,402 +223,130 @@ class Game:
 
         return surf_full, surf_empty
 
-    def load_level(self, map_id):
-        self.tilemap.load('data/maps/' + str(map_id) + '.json')
+    def parse_level(self, map_id):
+        tilemap = Tilemap(self, tile_size=16)
+        tilemap.load('data/maps/' + str(map_id) + '.json')
+        errors = area_errors(tilemap.emitters)
+        if errors:
+            raise ValueError('map %s: %s' % (map_id, '; '.join(errors)))
 
-        self.leaf_spawners = []
-        for tree in self.tilemap.extract([('large_decor', 2)], keep=True):
-            self.leaf_spawners.append(pygame.Rect(4 + tree['pos'][0], 4 + tree['pos'][1], 23, 13))
+        emitters = [(emitter['type'], emitter['rect']) for emitter in tilemap.emitters]
+        for tree in tilemap.extract([('large_decor', 2)], keep=True):
+            emitters.append(('leaf', (4 + tree['pos'][0], 4 + tree['pos'][1], 23, 13)))
 
-        self.enemies = []
-        for spawner in self.tilemap.extract([('spawners', 0), ('spawners', 1)]):
+        player_spawn = None
+        enemy_spawns = []
+        for spawner in tilemap.extract([('spawners', 0), ('spawners', 1)]):
             if spawner['variant'] == 0:
-                self.player.pos = spawner['pos']
-                self.player.air_time = 0
-                self.player.health = self.player.max_health
+                player_spawn = spawner['pos']
             else:
-                self.enemies.append(Enemy(self, spawner['pos'], (8, 15)))
+                enemy_spawns.append(spawner['pos'])
+        return LevelSnapshot(tilemap, player_spawn, enemy_spawns, emitters)
+
+    def load_level(self, map_id):
+        # a level is parsed once; restarts restore its snapshot
+        snapshot = self.level_snapshots.get(map_id)
+        if not snapshot:
+            snapshot = self.level_snapshots[map_id] = self.parse_level(map_id)
+
+        if map_id != self.loaded_level:
+            # persist what the previous level decoded lazily; headless workers share the cache file, so they skip it
+            if not self.headless:
+                self.assets.pipeline.flush()
+            used = snapshot.used_tile_types()
+            self.assets.evict(*[name for name in self.assets.group('tiles') if name not in used])
+            self.menu.evict()
+            self.loaded_level = map_id
+        snapshot.restore(self)
 
         self.projectiles = []
         self.particles = []
         self.sparks = []
 
         self.scroll = [0, 0]
+        self.last_scroll = [0, 0]
+        self.player.last_pos = list(self.player.pos)
         self.dead = 0
         self.transition = -30
 
+    def restart_level(self):
+        self.load_level(self.level)
+
     def show_game_over(self):
-        
-        
-        font_large = pygame.font.Font(None, 48)
-        restart_text_large = font_large.render('PRESS R TO RESTART', True, (255, 255, 255))
-        restart_text = pygame.transform.scale(restart_text_large,
-                                            (restart_text_large.get_width() // 2,
-                                            restart_text_large.get_height() // 2))
-        
-        
-        shadow_large = font_large.render('PRESS R TO RESTART', True, (0, 0, 0))
-        shadow_text = pygame.transform.scale(shadow_large,
-                                            (shadow_large.get_width() // 2,
-                                            shadow_large.get_height() // 2))
-        
-        try:
-            game_over_img = self.assets.get('game_over') or load_image('GAME-OVER.png')
-        except Exception:
-            game_over_img = None
-        waiting = True
-        
-        while waiting:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_r:
-                        waiting = False
-                        self.load_level(self.level)
-
-            overlay = pygame.Surface(self.display.get_size(), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 180))
-            self.display.fill((0, 0, 0, 0))
-            self.display.blit(overlay, (0, 0))
-
-            
-            if game_over_img:
-                gw, gh = game_over_img.get_size()
-                gx = self.display.get_width() // 2 - gw // 2
-                gy = self.display.get_height() // 2 - gh // 2 - 16
-                self.display.blit(game_over_img, (gx, gy))
-            else:
-                
-                font = pygame.font.Font(None, 72)
-                game_over_text = font.render("GAME OVER", True, (255, 0, 0))
-                self.display.blit(game_over_text,
-                                (self.display.get_width() // 2 - game_over_text.get_width() // 2,
-                                self.display.get_height() // 2 - 60))
-
-            
-            visible = (pygame.time.get_ticks() // 500) % 2 == 0
-            if visible:
-                dw, dh = self.display.get_size()
-                px = (dw - restart_text.get_width()) // 2
-                py = 180
-                
-                self.display.blit(shadow_text, (px + 1, py + 1))
-                
-                self.display.blit(restart_text, (px, py))
+        if self.menu.run('game_over') == 'restart':
+            self.restart_level()
+            self.reset_clock()
 
-            self.screen.blit(pygame.transform.scale(self.display, self.screen.get_size()), (0, 0))
-            pygame.display.update()
-            self.clock.tick(60)
-    
     def show_congratulations(self):
-        
-        
-        font_large = pygame.font.Font(None, 48)
-        restart_text_large = font_large.render('PRESS R TO PLAY AGAIN', True, (255, 255, 255))
-        restart_text = pygame.transform.scale(restart_text_large,
-                                            (restart_text_large.get_width() // 2,
-                                            restart_text_large.get_height() // 2))
-        
-        
-        shadow_large = font_large.render('PRESS R TO PLAY AGAIN', True, (0, 0, 0))
-        shadow_text = pygame.transform.scale(shadow_large,
-                                            (shadow_large.get_width() // 2,
-                                            shadow_large.get_height() // 2))
-        
-        try:
-            you_win_img = self.assets.get('you_win') or load_image('YOU-WIN.png')
-        except Exception:
-            you_win_img = None
-
-        waiting = True
-        while waiting:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_r:
-                        waiting = False
-                        self.level = 0  
-                        self.load_level(self.level)
-
-            overlay = pygame.Surface(self.display.get_size(), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 180))
-            self.display.fill((0, 0, 0, 0))
-            self.display.blit(overlay, (0, 0))
-
-            
-            if you_win_img:
-                iw, ih = you_win_img.get_size()
-                ix = self.display.get_width() // 2 - iw // 2
-                iy = self.display.get_height() // 2 - ih // 2 - 16
-                self.display.blit(you_win_img, (ix, iy))
-            else:
-                font = pygame.font.Font(None, 40)
-                congrats_text = font.render("CONGRATULATIONS!", True, (0, 255, 0))
-                self.display.blit(congrats_text,
-                                (self.display.get_width() // 2 - congrats_text.get_width() // 2,
-                                self.display.get_height() // 2 - 60))
-
-            
-            visible = (pygame.time.get_ticks() // 500) % 2 == 0
-            if visible:
-                dw, dh = self.display.get_size()
-                px = (dw - restart_text.get_width()) // 2
-                py = 150
-                
-                self.display.blit(shadow_text, (px + 1, py + 1))
-                
-                self.display.blit(restart_text, (px, py))
-
-            self.screen.blit(pygame.transform.scale(self.display, self.screen.get_size()), (0, 0))
-            pygame.display.update()
-            self.clock.tick(60)
-
+        if self.menu.run('congratulations') == 'play_again':
+            self.completed = False
+            self.level = 0
+            self.load_level(self.level)
+            self.reset_clock()
 
     def show_title(self):
-        """Display the title image (no text). Wait for any key or mouse press to continue."""
-        try:
-            
-            title_img = self.assets.get('title') or load_image('title-menu.png')
-        except Exception:
-            title_img = None
+        """Show the title screen until Enter is pressed, then play the player's jump off it."""
+        self.menu.run('title')
 
-        
-        
-        font_large = pygame.font.Font(None, 48)
-        prompt_text_large = font_large.render('PRESS ENTER', True, (255, 255, 255))
-        
-        prompt_text = pygame.transform.scale(prompt_text_large, 
-                                              (prompt_text_large.get_width() // 2, 
-                                               prompt_text_large.get_height() // 2))
-
-        
-        if title_img:
-            self.assets['title'] = title_img
-            iw, ih = title_img.get_size()
-            dw, dh = self.display.get_size()
-            scale = min(dw / iw, dh / ih)
-            new_size = (max(1, int(iw * scale)), max(1, int(ih * scale)))
-            img_scaled = pygame.transform.smoothscale(title_img, new_size)
-            img_x = (dw - new_size[0]) // 2
-            img_y = (dh - new_size[1]) // 2
-        else:
-            img_scaled = None
-            img_x = img_y = 0
-
-        
-        idle_anim = None
         try:
-            if isinstance(self.assets.get('player/idle'), Animation):
-                idle_anim = self.assets.get('player/idle').copy()
+            jump_anim = None
+            if isinstance(self.assets.get('player/jump'), Animation):
+                jump_anim = self.assets.get('player/jump').copy()
             else:
-                idle_anim = Animation(load_images('entities/player/idle'), img_dur=6)
+                jump_anim = Animation(load_images('entities/player/idle', rle=False), img_dur=6)
         except Exception:
-            idle_anim = None
+            jump_anim = None
+        player = self.menu.anchor('title', 'player')
+        player_center = player.center if player else (self.display.get_width() // 2, self.display.get_height() // 2 + 40)
 
-        
-        dw, dh = self.display.get_size()
-        if img_scaled:
-            player_center_x = img_x + (new_size[0] // 2)
-            
-            player_center_y = img_y + new_size[1] - 127
-        else:
-            player_center_x = dw // 2
-            player_center_y = dh // 2 + 40
+        total_frames = 30
+        jump_height = 28
 
-        waiting = True
-        while waiting:
+        self.audio.play('jump')
+
+        for t in range(total_frames):
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN or event.key == pygame.K_KP_ENTER:
-                        
-                        play_jump = True
-                        waiting = False
-
-            
-            self.display.fill((0, 0, 0))
-
-            
-            if img_scaled:
-                self.display.blit(img_scaled, (img_x, img_y))
-
-            
-            if idle_anim:
-                idle_anim.update()
+                    self.quit()
+
+            if jump_anim:
+                jump_anim.update()
                 try:
-                    frame_img = idle_anim.img()
-                    fx = player_center_x - frame_img.get_width() // 2
-                    fy = player_center_y - frame_img.get_height() // 2
-                    self.display.blit(frame_img, (fx, fy))
+                    frame_img = jump_anim.img()
                 except Exception:
-                    
-                    pass
-
-            
-            visible = (pygame.time.get_ticks() // 500) % 2 == 0
-            if visible:
-                dw, dh = self.display.get_size()
-                px = (dw - prompt_text.get_width()) // 2
-                py = 30
-                
-                shadow_large = font_large.render('PRESS ENTER', True, (0, 0, 0))
-                shadow_text = pygame.transform.scale(shadow_large, 
-                                                      (shadow_large.get_width() // 2, 
-                                                       shadow_large.get_height() // 2))
-                self.display.blit(shadow_text, (px + 1, py + 1))
-                self.display.blit(prompt_text, (px, py))
-
-            
-            self.screen.blit(pygame.transform.scale(self.display, self.screen.get_size()), (0, 0))
-            pygame.display.update()
-            self.clock.tick(60)
-
-        
-        if 'play_jump' in locals() and play_jump:
-            
-            try:
-                jump_anim = None
-                if isinstance(self.assets.get('player/jump'), Animation):
-                    jump_anim = self.assets.get('player/jump').copy()
-                elif idle_anim:
-                    jump_anim = idle_anim.copy()
-                else:
-                    jump_anim = Animation(load_images('entities/player/idle'), img_dur=6)
-            except Exception:
-                jump_anim = None
-
-            
-            total_frames = 30
-            jump_height = 28
-
-            
-            try:
-                if 'jump' in self.sfx:
-                    self.sfx['jump'].play()
-            except Exception:
-                pass
-
-            for t in range(total_frames):
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        pygame.quit()
-                        sys.exit()
-
-                
-                if jump_anim:
-                    jump_anim.update()
-                    try:
-                        frame_img = jump_anim.img()
-                    except Exception:
-                        frame_img = None
-                else:
                     frame_img = None
+            else:
+                frame_img = None
 
-                u = t / float(max(1, total_frames - 1))
-                
-                y_off = -int(math.sin(u * math.pi) * jump_height)
-
-                
-                self.display.fill((0, 0, 0))
-                if img_scaled:
-                    self.display.blit(img_scaled, (img_x, img_y))
+            u = t / float(max(1, total_frames - 1))
+            y_off = -int(math.sin(u * math.pi) * jump_height)
 
-                
-                if frame_img:
-                    fx = player_center_x - frame_img.get_width() // 2
-                    fy = player_center_y - frame_img.get_height() // 2 + y_off
-                    self.display.blit(frame_img, (fx, fy))
+            self.menu.draw('title', skip=('player', 'prompt'))
+            if frame_img:
+                fx = player_center[0] - frame_img.get_width() // 2
+                fy = player_center[1] - frame_img.get_height() // 2 + y_off
+                self.display.blit(frame_img, (fx, fy))
 
-                
-                self.screen.blit(pygame.transform.scale(self.display, self.screen.get_size()), (0, 0))
-                pygame.display.update()
-                self.clock.tick(60)
+            self.present(self.display)
+            self.clock.tick(60)
 
-            
-            pygame.time.delay(120)
-
-        
+        pygame.time.delay(120)
 
     def draw_pause_menu(self):
-        """Draw the pause menu overlay with resume and quit buttons"""
-
-        overlay = pygame.Surface(self.display.get_size(), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 180))
-        self.display.blit(overlay, (0, 0))
-
-        pause_img = self.assets['pause']          
-        resume_img = self.assets['pause_resume']  
-        quit_img = self.assets['pause_quit']      
-        target_pause_width = 180  
-        target_pause_height = 50  
-        pause_img = pygame.transform.smoothscale(pause_img, (target_pause_width, target_pause_height))
-        
-        target_button_width = 140  
-        target_button_height = 50  
-        resume_img = pygame.transform.smoothscale(resume_img, (target_button_width, target_button_height))
-        quit_img = pygame.transform.smoothscale(quit_img, (target_button_width, target_button_height))
-        
-        pause_rect = pause_img.get_rect(center=(160, 70))      
-        resume_rect = resume_img.get_rect(center=(160, 130))   
-        quit_rect = quit_img.get_rect(center=(160, 190))       
-        
-        
+        """Draw the pause menu overlay and act on its resume and quit buttons"""
         mouse = pygame.mouse.get_pos()
-        mx = mouse[0] * (320 / self.screen.get_width())
-        my = mouse[1] * (240 / self.screen.get_height())
-         
-        self.display.blit(pause_img, pause_rect)
-        self.display.blit(resume_img, resume_rect)
-        self.display.blit(quit_img, quit_rect)
-        
-        is_resume_hover = resume_rect.collidepoint(mx, my)
-        is_quit_hover = quit_rect.collidepoint(mx, my)
-        
-        if is_resume_hover:
-            hover_resume = pygame.transform.scale(resume_img, 
-                                                (int(target_button_width * 1.1), 
-                                                int(target_button_height * 1.1)))
-            hover_rect = hover_resume.get_rect(center=(160, 130))
-            self.display.blit(hover_resume, hover_rect)
-            resume_rect = hover_rect  
-        
-        if is_quit_hover:
-            hover_quit = pygame.transform.scale(quit_img, 
-                                            (int(target_button_width * 1.1), 
-                                            int(target_button_height * 1.1)))
-            hover_rect = hover_quit.get_rect(center=(160, 190))
-            self.display.blit(hover_quit, hover_rect)
-            quit_rect = hover_rect  
-        
-        
-        mouse_clicked = False
+        pointer = (mouse[0] * (320 / self.screen.get_width()), mouse[1] * (240 / self.screen.get_height()))
+        self.menu.draw('pause', pointer=pointer)
+
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    self.menu_open = False
-                    return
-            
-            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                mouse_clicked = True
-             
-        if mouse_clicked:
-            if resume_rect.collidepoint(mx, my):
+                self.quit()
+            action = self.menu.action('pause', event, pointer)
+            if action == 'resume':
                 self.menu_open = False
                 return
-            if quit_rect.collidepoint(mx, my):
-                pygame.quit()
-                sys.exit()
+            if action == 'quit':
+                self.quit()
 
     def _draw_hearts(self):
         """Draws the heart HUD with a soft gray background panel."""
@@ -533,7 +357,7 @@ class Game:
         bg_rect = pygame.Rect(4, 4, total_width + 8, heart_h + 8)
 
         
-        bg_surf = pygame.Surface((bg_rect.width, bg_rect.height), pygame.SRCALPHA)
+        bg_surf = make_surface((bg_rect.width, bg_rect.height), SURFACE_ALPHA)
         bg_surf.fill((40, 40, 40, 160))
         pygame.draw.rect(bg_surf, (80, 80, 80, 180), bg_surf.get_rect(), 1, border_radius=4)
         self.display.blit(bg_surf, (bg_rect.x, bg_rect.y))
@@ -552,12 +376,10 @@ class Game:
         level_num = self.level + 1  # Convert from 0-based to 1-based
         
         # Create background panel
-        font = pygame.font.Font(None, 22)
         level_text = f"LEVEL {level_num}"
         
         # Render text
-        text_surface = font.render(level_text, True, (255, 255, 255))
-        shadow_surface = font.render(level_text, True, (0, 0, 0))
+        text_surface = self.text.render(level_text, 22)
         
         # Calculate position
         padding = 8
@@ -574,7 +396,7 @@ class Game:
         bg_rect = pygame.Rect(x_pos - 10, y_pos - 4, bg_width, bg_height)
         
         # Draw background with gradient effect
-        bg_surf = pygame.Surface((bg_width, bg_height), pygame.SRCALPHA)
+        bg_surf = make_surface((bg_width, bg_height), SURFACE_ALPHA)
         
         # Draw gradient background
         for i in range(bg_height):
@@ -594,8 +416,7 @@ class Game:
         pygame.draw.circle(bg_surf, (40, 80, 160, 255), icon_center, icon_radius, 2)
         
         # Draw level number in icon
-        icon_font = pygame.font.Font(None, 16)
-        icon_text = icon_font.render(str(level_num), True, (255, 255, 255))
+        icon_text = self.text.render(str(level_num), 16)
         icon_rect = icon_text.get_rect(center=icon_center)
         bg_surf.blit(icon_text, icon_rect)
         
@@ -605,185 +426,477 @@ class Game:
         # Draw "LEVEL" text on the LEFT side (before the icon)
         # We need to draw just the word "LEVEL" and then the number in the circle
         level_word = "LEVEL"
-        level_word_surface = font.render(level_word, True, (255, 255, 255))
-        level_word_shadow = font.render(level_word, True, (0, 0, 0))
+        level_word_surface = self.text.render(level_word, 22, shadow=(0, 0, 0))
         
         # Position the "LEVEL" text on the left side of the background
         text_x = x_pos
-        self.display.blit(level_word_shadow, (text_x + 1, y_pos + 1))
         self.display.blit(level_word_surface, (text_x, y_pos))
 
+    def reset_clock(self):
+        self.accumulator = 0
+        self.last_time = time.perf_counter()
+
+    def handle_events(self):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.quit()
+
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:        
+                    self.menu_open = not self.menu_open
+                    self.menu_selected = 0
+                if event.key == pygame.K_F3:
+                    self.profiler.visible = not self.profiler.visible
+                    self.profiler.enabled = self.profiler.visible or bool(self.profile_csv)
+                if event.key == pygame.K_F4:
+                    path = time.strftime('profile-%Y%m%d-%H%M%S.csv')
+                    self.profiler.export_csv(path)
+                    print('wrote frame profile to ' + path)
+                if event.key == pygame.K_F5:
+                    if self.capture:
+                        self.capture.close()
+                        self.capture = None
+                    else:
+                        self.capture = FrameCapture(time.strftime('capture-%Y%m%d-%H%M%S.plcap'), self.display_2.get_size())
+                if self.replay:
+                    continue
+                if event.key == pygame.K_a:
+                    self.movement[0] = True
+                if event.key == pygame.K_d:
+                    self.movement[1] = True
+                if event.key == pygame.K_SPACE:
+                    self.pending_jump = True
+                if event.key == pygame.K_l:
+                    self.pending_dash = True
+
+            if event.type == pygame.KEYUP:
+                if event.key == pygame.K_a:
+                    self.movement[0] = False
+                if event.key == pygame.K_d:
+                    self.movement[1] = False
+
+    def finish_recording(self):
+        # completing the game ends a recording, so its digest is the state a replay of it stops at
+        if self.recorder:
+            self.recorder.save(self.record_path, self.state_digest())
+            self.recorder = None
+
+    def quit(self):
+        self.finish_recording()
+        if self.profile_csv:
+            self.profiler.export_csv(self.profile_csv)
+        if self.capture:
+            self.capture.close()
+        if self.telemetry:
+            self.telemetry.close()
+        if self.reloader:
+            self.reloader.close()
+        self.presenter.close()
+        # waits for outstanding decodes, so everything decoded this session is in the cache next launch
+        self.assets.pipeline.close()
+        pygame.quit()
+        sys.exit()
+
+    def state_digest(self):
+        state = (self.level, self.deaths, self.player.pos, self.player.velocity, self.player.dashing, self.player.health,
+                 [(enemy.pos, enemy.walking, enemy.flip) for enemy in self.enemies], self.projectiles)
+        return hashlib.sha1(repr(state).encode()).hexdigest()
+
+    def next_input(self):
+        """The input for the next step: the replay's if one is playing, otherwise the live keyboard state."""
+        if self.replay:
+            if self.replay_frame < len(self.replay):
+                self.replay_frame += 1
+                return self.replay.inputs[self.replay_frame - 1]
+            return (False, False, False, False)
+        frame_input = (self.movement[0], self.movement[1], self.pending_jump, self.pending_dash)
+        self.pending_jump = False
+        self.pending_dash = False
+        return frame_input
+
+    def jump(self):
+        if self.player.jump():
+            self.audio.play('jump')
+
+    def apply_input(self, left, right, jump=False, dash=False):
+        if self.recorder:
+            self.recorder.record(left, right, jump, dash)
+        self.movement = [left, right]
+        if jump:
+            self.jump()
+        if dash:
+            self.player.dash()
+
+    def update(self):
+        """Advance the simulation by one fixed step."""
+        self.audio.update()
+        if self.profiler.enabled:
+            self.profiler.run(self.update_phases, 'update/')
+            return
+        for name, phase in self.update_phases:
+            phase()
+
+    def update_world(self):
+        self.screenshake = max(0, self.screenshake - 1)
+
+        if not len(self.enemies):
+            self.transition += 1
+            if self.transition > 30:
+                total_levels = len(os.listdir('data/maps'))
+                if self.level + 1 >= total_levels:
+                    # the loop running the steps ends the replay or shows the congratulations screen once this step is done
+                    self.completed = True
+                else:
+                    self.level += 1
+                    self.load_level(self.level)
+
+        if self.transition < 0:
+            self.transition += 1
+
+        if self.dead:
+            self.dead += 1
+            if self.dead >= 10:
+                self.transition = min(30, self.transition + 1)
+            if self.dead > 10 and self.transition >= 30:
+                self.deaths += 1
+                if self.headless or self.replay:
+                    self.restart_level()
+                else:
+                    self.show_game_over()
+
+        self.last_scroll = list(self.scroll)
+        self.scroll[0] += (self.player.rect().centerx - self.display.get_width() / 2 - self.scroll[0]) / 30
+        self.scroll[1] += (self.player.rect().centery - self.display.get_height() / 2 - self.scroll[1]) / 30
+
+    def update_emitters(self):
+        self.emitters.update()
+
+    def update_enemies(self):
+        for enemy in self.enemies.copy():
+            kill = enemy.update(self.tilemap, (0, 0))
+            if kill:
+                self.enemies.remove(enemy)
+
+    def update_player(self):
+        if not self.dead:
+            self.player.update(self.tilemap, (self.movement[1] - self.movement[0], 0))
+
+    def update_projectiles(self):
+        for projectile in self.projectiles:
+            projectile[0][0] += projectile[1]
+            projectile[2] += 1
+        # one batched wall test for every projectile; moving them never depends on another's outcome
+        hits = self.tilemap.solid_at_points([projectile[0] for projectile in self.projectiles])
+        for projectile, hit in zip(self.projectiles.copy(), hits):
+            if hit:
+                self.projectiles.remove(projectile)
+                for _ in range(self.quality.count(4)):
+                    self.sparks.append(Spark(projectile[0], self.fx_rng.random() - 0.5 +
+                                             (math.pi if projectile[1] > 0 else 0), 2 + self.fx_rng.random()))
+            elif projectile[2] > 360:
+                self.projectiles.remove(projectile)
+            elif abs(self.player.dashing) < 50:
+                if self.player.rect().collidepoint(projectile[0]):
+                    self.projectiles.remove(projectile)
+                    self.player.health = max(0, getattr(self.player, 'health', 1) - 1)
+                    self.audio.play('hit')
+                    self.screenshake = max(16, self.screenshake)
+                    self.emitters.burst('hit', self.player.rect().center)
+                    if self.player.health <= 0:
+                        self.dead += 1
+
+    def update_sparks(self):
+        for spark in self.sparks.copy():
+            kill = spark.update()
+            if kill:
+                self.sparks.remove(spark)
+
+    def update_particles(self):
+        for particle in self.particles.copy():
+            kill = particle.update()
+            if particle.type == 'leaf':
+                particle.pos[0] += math.sin(particle.animation.frame * 0.035) * 0.3
+            if kill:
+                self.particles.remove(particle)
+
+    def render(self, alpha=1.0):
+        """Draw the current state, interpolated alpha of the way from the previous step."""
+        scroll = (self.last_scroll[0] + (self.scroll[0] - self.last_scroll[0]) * alpha,
+                  self.last_scroll[1] + (self.scroll[1] - self.last_scroll[1]) * alpha)
+        self.render_scroll = (int(scroll[0]), int(scroll[1]))
+        self.render_alpha = alpha
+        self.camera.update(self.render_scroll)
+        self.profiler.counts = self.camera.culled
+
+        if self.profiler.enabled:
+            self.profiler.run(self.render_phases, 'render/')
+            return
+        for name, phase in self.render_phases:
+            phase()
+
+    def render_background(self):
+        self.display.fill((0, 0, 0, 0))
+        self.display_2.blit(self.assets['background'], (0, 0))
+        self.clouds.render(self.display, offset=self.render_scroll, count=self.quality.clouds)
+
+    def render_tilemap(self):
+        self.tilemap.render(self.display, offset=self.render_scroll, camera=self.camera)
+
+    def render_entities(self):
+        for enemy in self.camera.cull('enemies', self.enemies):
+            enemy.render(self.display, offset=self.interpolated_offset(enemy, self.render_scroll, self.render_alpha))
+
+        if not self.dead:
+            self.player.render(self.display, offset=self.interpolated_offset(self.player, self.render_scroll, self.render_alpha))
+
+    def render_projectiles(self):
+        img = self.assets['projectile']
+        for projectile in self.camera.cull('projectiles', self.projectiles, pos=lambda projectile: projectile[0]):
+            self.display.blit(img, (
+                projectile[0][0] - projectile[1] * (1 - self.render_alpha) - img.get_width() / 2 - self.render_scroll[0],
+                projectile[0][1] - img.get_height() / 2 - self.render_scroll[1]
+            ))
+
+    def render_sparks(self):
+        for spark in self.camera.cull('sparks', self.sparks):
+            spark.render(self.display, offset=self.render_scroll)
+
+    def render_outline(self):
+        if not self.quality.outline:
+            return
+        display_mask = pygame.mask.from_surface(self.display)
+        display_silhouette = display_mask.to_surface(setcolor=(0, 0, 0, 180),
+                                                     unsetcolor=(0, 0, 0, 0))
+        for offset in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+            self.display_2.blit(display_silhouette, offset)
+
+    def render_particles(self):
+        for particle in self.camera.cull('particles', self.particles):
+            particle.render(self.display, offset=self.render_scroll)
+
+    def render_hud(self):
+        if self.transition:
+            transition_surf = make_surface(self.display.get_size(), SURFACE_OPAQUE)
+            pygame.draw.circle(transition_surf, (255, 255, 255),
+                               (self.display.get_width() // 2, self.display.get_height() // 2),
+                               (30 - abs(self.transition)) * 8)
+            transition_surf.set_colorkey((255, 255, 255))
+            self.display.blit(transition_surf, (0, 0))
+
+        
+        self._draw_hearts()
+        
+        # Draw level indicator in upper right corner
+        self._draw_level_indicator()
+
+        self.display_2.blit(self.display, (0, 0))
+
+    def present(self, surf=None, offset=(0, 0)):
+        self.presenter.present(surf if surf is not None else self.display_2, offset)
+
+    def sample_telemetry(self, frame_ms):
+        self.telemetry.frame(frame_ms, enemies=len(self.enemies), projectiles=len(self.projectiles),
+                             sparks=len(self.sparks), particles=len(self.particles))
+
+    def interpolated_offset(self, entity, offset, alpha):
+        # shifting the camera by the entity's not-yet-rendered movement draws it at the interpolated position
+        return (offset[0] + (entity.pos[0] - entity.last_pos[0]) * (1 - alpha),
+                offset[1] + (entity.pos[1] - entity.last_pos[1]) * (1 - alpha))
+
+    def simulate(self, frames, inputs=None, render=False, until=None):
+        """Step the game frames times as fast as possible, stopping early once the last level is completed.
+
+        inputs is either a sequence of per-frame (left, right, jump, dash) tuples or a callable
+        inputs(game, frame) returning one. until(game) returning True after a step also stops early.
+        Returns the number of frames stepped.
+        """
+        if not hasattr(self, 'enemies'):
+            self.load_level(self.level)
+        self.completed = False
+
+        frame = 0
+        while frame < frames and not self.completed:
+            if callable(inputs):
+                self.apply_input(*inputs(self, frame))
+            elif inputs is not None:
+                self.apply_input(*(inputs[frame] if frame < len(inputs) else (False, False)))
+            else:
+                self.apply_input(*self.next_input())
+            if self.profiler.enabled:
+                self.profiler.begin_frame()
+            step_start = time.perf_counter()
+            self.update()
+            if render:
+                self.render()
+            if self.profiler.enabled:
+                self.profiler.end_frame()
+            if self.telemetry:
+                self.sample_telemetry((time.perf_counter() - step_start) * 1000)
+            frame += 1
+            if until and until(self):
+                break
+        return frame
+
+    def finish_replay(self):
+        digest = self.state_digest()
+        if self.replay.digest and digest != self.replay.digest:
+            print('replay diverged after %d frames: %s != %s' % (self.replay_frame, digest, self.replay.digest))
+        else:
+            print('replay finished after %d frames: %s' % (self.replay_frame, digest))
+        if not self.headless:
+            self.quit()
+
     def run(self):
         
-        try:
-            self.show_title()
-        except Exception:
-            
-            pass
+        if not self.skip_title:
+            with self.tracer.span('title', idle=True):
+                try:
+                    self.show_title()
+                except Exception:
+                    
+                    pass
 
-        pygame.mixer.music.load('data/music.wav')
-        pygame.mixer.music.set_volume(0.5)
-        pygame.mixer.music.play(-1)
-        self.sfx['ambience'].play(-1)
+        with self.tracer.span('level ' + str(self.level)):
+            self.load_level(self.level)
+        self.assets.pipeline.flush()
 
-        while True:
-            self.display.fill((0, 0, 0, 0))
-            self.display_2.blit(self.assets['background'], (0, 0))
-            self.screenshake = max(0, self.screenshake - 1)
+        with self.tracer.span('music'):
+            pygame.mixer.music.load('data/music.wav')
+            pygame.mixer.music.set_volume(0.5)
+            pygame.mixer.music.play(-1)
+            self.audio.play_ambience('ambience')
+        first_frame = time.perf_counter()
 
+        self.reset_clock()
+        while True:
             if self.menu_open:
+                self.display.fill((0, 0, 0, 0))
+                self.display_2.blit(self.assets['background'], (0, 0))
                 self.draw_pause_menu()
                 self.display_2.blit(self.display, (0, 0))
-                self.screen.blit(pygame.transform.scale(self.display_2, self.screen.get_size()), (0, 0))
-                pygame.display.update()
+                self.present()
                 self.clock.tick(60)
+                self.reset_clock()
                 
                 continue
 
-            if not len(self.enemies):
-                self.transition += 1
-                if self.transition > 30:
-                    total_levels = len(os.listdir('data/maps'))
-                    if self.level + 1 >= total_levels:
-                        self.show_congratulations()  
-                    else:
-                        self.level += 1
-                        self.load_level(self.level)
-
-            if self.transition < 0:
-                self.transition += 1
-
-            if self.dead:
-                self.dead += 1
-                if self.dead >= 10:
-                    self.transition = min(30, self.transition + 1)
-                if self.dead > 10 and self.transition >= 30:
-                    self.show_game_over()
-
-            self.scroll[0] += (self.player.rect().centerx - self.display.get_width() / 2 - self.scroll[0]) / 30
-            self.scroll[1] += (self.player.rect().centery - self.display.get_height() / 2 - self.scroll[1]) / 30
-            render_scroll = (int(self.scroll[0]), int(self.scroll[1]))
-
-            for rect in self.leaf_spawners:
-                if random.random() * 49999 < rect.width * rect.height:
-                    pos = (rect.x + random.random() * rect.width, rect.y + random.random() * rect.height)
-                    self.particles.append(Particle(self, 'leaf', pos, velocity=[-0.1, 0.3], frame=random.randint(0, 20)))
-
-            self.clouds.update()
-            self.clouds.render(self.display, offset=render_scroll)
-            self.tilemap.render(self.display, offset=render_scroll)
-
-            for enemy in self.enemies.copy():
-                kill = enemy.update(self.tilemap, (0, 0))
-                enemy.render(self.display, offset=render_scroll)
-                if kill:
-                    self.enemies.remove(enemy)
-
-            if not self.dead:
-                self.player.update(self.tilemap, (self.movement[1] - self.movement[0], 0))
-                self.player.render(self.display, offset=render_scroll)
-
-            for projectile in self.projectiles.copy():
-                projectile[0][0] += projectile[1]
-                projectile[2] += 1
-                img = self.assets['projectile']
-                self.display.blit(img, (
-                    projectile[0][0] - img.get_width() / 2 - render_scroll[0],
-                    projectile[0][1] - img.get_height() / 2 - render_scroll[1]
-                ))
-                if self.tilemap.solid_check(projectile[0]):
-                    self.projectiles.remove(projectile)
-                    for _ in range(4):
-                        self.sparks.append(Spark(projectile[0], random.random() - 0.5 +
-                                                 (math.pi if projectile[1] > 0 else 0), 2 + random.random()))
-                elif projectile[2] > 360:
-                    self.projectiles.remove(projectile)
-                elif abs(self.player.dashing) < 50:
-                    if self.player.rect().collidepoint(projectile[0]):
-                        self.projectiles.remove(projectile)
-                        self.player.health = max(0, getattr(self.player, 'health', 1) - 1)
-                        self.sfx['hit'].play()
-                        self.screenshake = max(16, self.screenshake)
-                        for _ in range(30):
-                            angle = random.random() * math.pi * 2
-                            speed = random.random() * 5
-                            self.sparks.append(Spark(self.player.rect().center, angle, 2 + random.random()))
-                            self.particles.append(
-                                Particle(self, 'particle', self.player.rect().center,
-                                         velocity=[math.cos(angle + math.pi) * speed * 0.5,
-                                                   math.sin(angle + math.pi) * speed * 0.5],
-                                         frame=random.randint(0, 7))
-                            )
-                        if self.player.health <= 0:
-                            self.dead += 1
-
-            for spark in self.sparks.copy():
-                kill = spark.update()
-                spark.render(self.display, offset=render_scroll)
-                if kill:
-                    self.sparks.remove(spark)
-
-            display_mask = pygame.mask.from_surface(self.display)
-            display_silhouette = display_mask.to_surface(setcolor=(0, 0, 0, 180),
-                                                         unsetcolor=(0, 0, 0, 0))
-            for offset in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                self.display_2.blit(display_silhouette, offset)
-
-            for particle in self.particles.copy():
-                kill = particle.update()
-                particle.render(self.display, offset=render_scroll)
-                if particle.type == 'leaf':
-                    particle.pos[0] += math.sin(particle.animation.frame * 0.035) * 0.3
-                if kill:
-                    self.particles.remove(particle)
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    exit()
-
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:        
-                        self.menu_open = not self.menu_open
-                        self.menu_selected = 0
-                    if event.key == pygame.K_a:
-                        self.movement[0] = True
-                    if event.key == pygame.K_d:
-                        self.movement[1] = True
-                    if event.key == pygame.K_SPACE:
-                        if self.player.jump():
-                            self.sfx['jump'].play()
-                    if event.key == pygame.K_l:
-                        self.player.dash()
-
-                if event.type == pygame.KEYUP:
-                    if event.key == pygame.K_a:
-                        self.movement[0] = False
-                    if event.key == pygame.K_d:
-                        self.movement[1] = False
-
-            if self.transition:
-                transition_surf = pygame.Surface(self.display.get_size())
-                pygame.draw.circle(transition_surf, (255, 255, 255),
-                                   (self.display.get_width() // 2, self.display.get_height() // 2),
-                                   (30 - abs(self.transition)) * 8)
-                transition_surf.set_colorkey((255, 255, 255))
-                self.display.blit(transition_surf, (0, 0))
-
-            
-            self._draw_hearts()
-            
-            # Draw level indicator in upper right corner
-            self._draw_level_indicator()
-
-            self.display_2.blit(self.display, (0, 0))
-            screenshake_offset = (
-                random.random() * self.screenshake - self.screenshake / 2,
-                random.random() * self.screenshake - self.screenshake / 2
-            )
-            self.screen.blit(pygame.transform.scale(self.display_2, self.screen.get_size()), screenshake_offset)
-            pygame.display.update()
-            self.clock.tick(60)
-
-
-Game().run()
\ No newline at end of file
+            # speed scales simulated time per real second, e.g. to fast-forward a replay
+            max_steps = MAX_CATCHUP_STEPS * math.ceil(self.speed)
+            now = time.perf_counter()
+            self.accumulator += min((now - self.last_time) * self.speed, FIXED_DT * max_steps)
+            self.last_time = now
+
+            self.handle_events()
+            if self.reloader:
+                self.reloader.update()
+            profiling = self.profiler.enabled
+            if profiling:
+                self.profiler.begin_frame()
+            work_start = time.perf_counter()
+
+            steps = 0
+            while self.accumulator >= FIXED_DT and steps < max_steps:
+                self.apply_input(*self.next_input())
+                self.update()
+                self.accumulator -= FIXED_DT
+                steps += 1
+                if self.replay and (self.replay_frame >= len(self.replay) or self.completed):
+                    self.finish_replay()
+                if self.completed:
+                    self.finish_recording()
+                    self.show_congratulations()
+                    break
+            if steps == max_steps:
+                # too far behind to catch up: let the game slow down instead of spiralling
+                self.accumulator = min(self.accumulator, FIXED_DT)
+
+            self.render(self.accumulator / FIXED_DT)
+            # screenshake is drawn per render frame, so it must not draw from the simulation's generators
+            self.render_frame += 1
+            if self.render_frame % self.quality.shake_interval == 0 or not self.screenshake:
+                self.shake_offset = (
+                    random.random() * self.screenshake - self.screenshake / 2,
+                    random.random() * self.screenshake - self.screenshake / 2
+                )
+            screenshake_offset = self.shake_offset
+            if self.capture:
+                self.capture.grab(self.display_2)
+            if profiling:
+                if self.profiler.visible:
+                    with self.profiler.scope('profiler'):
+                        self.profiler.render(self.display_2)
+                with self.profiler.scope('present'):
+                    self.present(offset=screenshake_offset)
+                self.profiler.end_frame()
+            else:
+                self.present(offset=screenshake_offset)
+            work_ms = (time.perf_counter() - work_start) * 1000
+            self.quality.observe(work_ms)
+            if self.telemetry:
+                self.sample_telemetry(work_ms)
+
+            if not self.tracer.finished:
+                self.tracer.record('first frame', first_frame)
+                if self.startup_report:
+                    self.tracer.write(self.startup_report)
+                self.tracer.finished = True
+                if self.quit_after_startup:
+                    self.quit()
+
+            self.clock.tick(self.max_fps)
+
+
+if __name__ == '__main__':
+    tracer = StartupTracer(START_TIME)
+    tracer.record('imports', START_TIME)
+
+    parser = argparse.ArgumentParser(description='Platformia')
+    parser.add_argument('--skip-title', action='store_true', help='start straight into the first level')
+    parser.add_argument('--startup-report', metavar='PATH', help='write a JSON report of startup phase timings')
+    parser.add_argument('--quit-after-startup', action='store_true', help='exit once the first gameplay frame is presented')
+    parser.add_argument('--max-fps', type=int, help='render frame rate cap (default: display refresh rate, 0 for uncapped)')
+    parser.add_argument('--headless', action='store_true', help='simulate without a window or audio as fast as possible')
+    parser.add_argument('--frames', type=int, default=3600, help='frames to simulate in headless mode')
+    parser.add_argument('--level', type=int, default=0, help='level to start on')
+    parser.add_argument('--render', action='store_true', help='also render every frame in headless mode')
+    parser.add_argument('--seed', type=int, help='seed for the game\'s random generators')
+    parser.add_argument('--record', metavar='PATH', help='record the seed and per-step inputs of this session')
+    parser.add_argument('--replay', metavar='PATH', help='play back a recorded session')
+    parser.add_argument('--speed', type=float, default=1.0, help='simulation speed multiplier, e.g. to fast-forward a replay')
+    parser.add_argument('--quality', choices=['auto', 'high', 'medium', 'low', 'minimum'], default='auto',
+                        help='cosmetic effects quality (default: adapt to the frame budget)')
+    parser.add_argument('--frame-budget', type=float, metavar='MS',
+                        help='frame time the quality governor and telemetry aim for (default: one 60 Hz simulation step)')
+    parser.add_argument('--threaded-present', action='store_true',
+                        help='scale and flip finished frames on a worker thread while the next one is simulated')
+    parser.add_argument('--capture', metavar='PATH', help='record the gameplay frames to a capture file (F5 toggles)')
+    parser.add_argument('--telemetry', metavar='SINK',
+                        help='write per-second counters as JSON lines to a file, udp://host:port or stdout')
+    parser.add_argument('--hot-reload', action='store_true',
+                        help='apply edits to data/maps and data/images to the running game')
+    parser.add_argument('--profile', action='store_true', help='time every frame phase and show the profiler overlay (F3)')
+    parser.add_argument('--profile-csv', metavar='PATH', help='write the per-frame phase timings to a CSV file on exit')
+    args = parser.parse_args()
+
+    replay = Replay.load(args.replay) if args.replay else None
+    game = Game(tracer=tracer, skip_title=args.skip_title or bool(replay), startup_report=args.startup_report,
+                quit_after_startup=args.quit_after_startup, max_fps=args.max_fps, headless=args.headless,
+                level=args.level, seed=args.seed, record=args.record, replay=replay, speed=args.speed,
+                profile=args.profile, profile_csv=args.profile_csv, quality=args.quality,
+                threaded_present=args.threaded_present, capture=args.capture,
+                telemetry=args.telemetry, hot_reload=args.hot_reload, frame_budget=args.frame_budget)
+    if args.headless:
+        start = time.perf_counter()
+        frames = game.simulate(len(replay) if replay else args.frames, render=args.render)
+        elapsed = time.perf_counter() - start
+        print('simulated %d frames in %.2f s (%.0f fps, %.1fx real time): level %d, %d deaths%s'
+              % (frames, elapsed, frames / elapsed, frames * FIXED_DT / elapsed, game.level, game.deaths, ', completed' if game.completed else ''))
+        if replay:
+            game.finish_replay()
+        game.finish_recording()
+        if args.profile_csv:
+            game.profiler.export_csv(args.profile_csv)
+        if game.telemetry:
+            game.telemetry.close()
+    else:
+        game.run()
\ No newline at end of file
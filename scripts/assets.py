@@ -0,0 +1,255 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from scripts.utils import BASE_IMG_PATH, SURFACE_COLORKEY, Animation, convert_surface, blit_path
+
+CACHE_PATH = '.cache/images.bin'
+MANIFEST_PATH = 'data/assets.json'
+CACHE_MAGIC = b'PLFIMG01'
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+class ImageCache:
+    """Decoded RGBA pixels of every image, memory-mapped from a single file.
+
+    Layout: magic, u32 index length, JSON index, then the raw pixel buffers. Entries are
+    keyed by path and validated by mtime/size first, then by content hash.
+    """
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.index = {}
+        self.updates = {}
+        self.file = None
+        self.map = None
+        self.data_start = 0
+        self.lock = threading.Lock()
+        self.open()
+
+    def open(self):
+        try:
+            self.file = open(self.path, 'rb')
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.map[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+                raise ValueError('bad cache magic')
+            header = len(CACHE_MAGIC) + 4
+            index_len = struct.unpack('<I', self.map[len(CACHE_MAGIC):header])[0]
+            self.index = json.loads(self.map[header:header + index_len])
+            self.data_start = header + index_len
+        except (OSError, ValueError):
+            self.close()
+            self.index = {}
+
+    def lookup(self, path, stat):
+        with self.lock:
+            entry = self.index.get(path)
+            if not entry or not self.map:
+                return None
+            if entry['mtime'] != stat.st_mtime_ns or entry['size'] != stat.st_size:
+                if entry['hash'] != file_hash(BASE_IMG_PATH + path):
+                    return None
+                self.updates[path] = dict(entry, mtime=stat.st_mtime_ns, size=stat.st_size)
+            start = self.data_start + entry['offset']
+            return (entry['w'], entry['h']), self.map[start:start + entry['length']]
+
+    def store(self, path, stat, size, pixels):
+        entry = {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'hash': file_hash(BASE_IMG_PATH + path),
+                 'w': size[0], 'h': size[1], 'pixels': pixels}
+        with self.lock:
+            self.updates[path] = entry
+
+    def close(self):
+        if self.map:
+            self.map.close()
+            self.map = None
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def save(self):
+        with self.lock:
+            if self.updates:
+                self._write()
+
+    def _write(self):
+        index = {}
+        chunks = []
+        offset = 0
+        for path in sorted(set(self.index) | set(self.updates)):
+            if not os.path.exists(BASE_IMG_PATH + path):
+                continue
+            entry = self.updates.get(path) or self.index[path]
+            if 'pixels' in entry:
+                pixels = entry['pixels']
+            else:
+                old = self.index[path]
+                start = self.data_start + old['offset']
+                pixels = self.map[start:start + old['length']]
+            index[path] = {'mtime': entry['mtime'], 'size': entry['size'], 'hash': entry['hash'],
+                           'w': entry['w'], 'h': entry['h'], 'offset': offset, 'length': len(pixels)}
+            chunks.append(pixels)
+            offset += len(pixels)
+        self.close()
+
+        index_data = json.dumps(index, separators=(',', ':')).encode()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(CACHE_MAGIC)
+            f.write(struct.pack('<I', len(index_data)))
+            f.write(index_data)
+            for pixels in chunks:
+                f.write(pixels)
+        os.replace(tmp_path, self.path)
+        self.updates = {}
+        self.open()
+
+class AssetPipeline:
+    """Decodes images on a thread pool, backed by the on-disk ImageCache.
+
+    prefetch() queues decoding for every image under the given paths; image()/images()
+    then wait for the decoded pixels and convert them on the calling thread.
+    """
+    def __init__(self, cache_path=CACHE_PATH, workers=None):
+        self.cache = ImageCache(cache_path)
+        self.pool = ThreadPoolExecutor(max_workers=workers or min(8, (os.cpu_count() or 1) + 2))
+        self.pending = {}
+
+    def _decode(self, path):
+        stat = os.stat(BASE_IMG_PATH + path)
+        cached = self.cache.lookup(path, stat)
+        if cached:
+            return cached
+        # pygame releases the GIL while SDL_image decodes a file path
+        img = pygame.image.load(BASE_IMG_PATH + path)
+        pixels = pygame.image.tobytes(img, 'RGBA')
+        self.cache.store(path, stat, img.get_size(), pixels)
+        return img.get_size(), pixels
+
+    def _submit(self, path):
+        if path not in self.pending:
+            self.pending[path] = self.pool.submit(self._decode, path)
+        return self.pending[path]
+
+    def prefetch(self, paths):
+        for path in paths:
+            if os.path.isdir(BASE_IMG_PATH + path):
+                self.prefetch([path + '/' + name for name in sorted(os.listdir(BASE_IMG_PATH + path))])
+            else:
+                self._submit(path)
+
+    def image(self, path, role=SURFACE_COLORKEY, rle=True):
+        size, pixels = self._submit(path).result()
+        del self.pending[path]
+        return convert_surface(pygame.image.frombuffer(pixels, size, 'RGBA'), role, rle=rle)
+
+    def images(self, path, role=SURFACE_COLORKEY, rle=True):
+        images = []
+        for img_name in sorted(os.listdir(BASE_IMG_PATH + path)):
+            images.append(self.image(path + '/' + img_name, role, rle=rle))
+        return images
+
+    def prefetch_sounds(self, paths):
+        for path in paths:
+            if path not in self.pending:
+                self.pending[path] = self.pool.submit(pygame.mixer.Sound, path)
+
+    def sounds(self, paths):
+        self.prefetch_sounds(paths.values())
+        return {name: self.pending.pop(path).result() for name, path in paths.items()}
+
+    def flush(self):
+        self.cache.save()
+
+    def close(self):
+        self.pool.shutdown()
+        self.pending = {}
+        self.cache.save()
+        self.cache.close()
+
+def load_manifest(path=MANIFEST_PATH):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+class LazyAssets(dict):
+    """The game's asset dict, filled from the manifest the first time each name is looked up.
+
+    Entries belong to groups that can be prefetched (decoded in the background) or evicted as a whole.
+    Evict listeners are called with the evicted names, so holders of derived surfaces can drop them too.
+    """
+    def __init__(self, manifest=None, pipeline=None, target=None, tracer=None):
+        super().__init__()
+        self.manifest = manifest if manifest is not None else load_manifest()
+        self.pipeline = pipeline or AssetPipeline()
+        self.target = target
+        self.tracer = tracer
+        self.evict_listeners = []
+
+    def __missing__(self, name):
+        if name not in self.manifest:
+            raise KeyError(name)
+        if self.tracer:
+            with self.tracer.span('assets/' + self.manifest[name]['group']):
+                self[name] = self.build(name)
+        else:
+            self[name] = self.build(name)
+        return self[name]
+
+    def get(self, name, default=None):
+        if name in self or name in self.manifest:
+            return self[name]
+        return default
+
+    def build(self, name):
+        spec = self.manifest[name]
+        role = spec.get('role', SURFACE_COLORKEY)
+        rle = spec.get('rle', True)
+        if spec['type'] == 'image':
+            images = [self.pipeline.image(spec['path'], role, rle=rle)]
+            value = images[0]
+        else:
+            images = self.pipeline.images(spec['path'], role, rle=rle)
+            value = images
+            if spec['type'] == 'animation':
+                value = Animation(images, img_dur=spec.get('img_dur', 5), loop=spec.get('loop', True))
+
+        if self.target:
+            for i, img in enumerate(images):
+                reason = blit_path(img, self.target)
+                if reason:
+                    print('slow blit path for ' + name + '/' + str(i) + ': ' + reason, file=sys.stderr)
+        return value
+
+    def group(self, group):
+        return [name for name, spec in self.manifest.items() if spec['group'] == group]
+
+    def prefetch(self, *groups):
+        for group in groups:
+            self.prefetch_names(*self.group(group))
+
+    def prefetch_names(self, *names):
+        self.pipeline.prefetch([self.manifest[name]['path'] for name in names if name in self.manifest and name not in self])
+
+    def load(self, *groups):
+        for group in groups:
+            for name in self.group(group):
+                self[name]
+
+    def evict(self, *names):
+        for name in names:
+            self.pop(name, None)
+        for listener in self.evict_listeners:
+            listener(names)
+
+    def evict_group(self, *groups):
+        for group in groups:
+            self.evict(*self.group(group))
@@ -0,0 +1,72 @@
+import pygame
+
+from scripts.telemetry import counters
+
+# volume, priority (higher steals lower) and cooldown in frames between starts of the same sound
+SOUND_SETTINGS = {
+    'jump': {'volume': 0.7, 'priority': 2, 'cooldown': 4},
+    'dash': {'volume': 0.3, 'priority': 2, 'cooldown': 6},
+    'hit': {'volume': 0.8, 'priority': 3, 'cooldown': 4},
+    'shoot': {'volume': 0.4, 'priority': 1, 'cooldown': 6},
+    'ambience': {'volume': 0.2, 'priority': 0, 'cooldown': 0},
+}
+
+class Audio:
+    """Plays sound effects on a fixed budget of mixer channels.
+
+    Identical triggers in the same frame collapse into one voice, each sound has a cooldown,
+    and when every voice is busy a new sound steals the oldest voice of lower or equal priority.
+    Looping ambience gets its own reserved channel outside the budget.
+    """
+    def __init__(self, sounds, voices=8, settings=SOUND_SETTINGS):
+        self.sounds = sounds
+        self.settings = settings
+        self.frame = 0
+        self.last_played = {}
+
+        for name, sound in sounds.items():
+            sound.set_volume(settings.get(name, {}).get('volume', 1.0))
+
+        if sounds:
+            pygame.mixer.set_num_channels(voices + 1)
+            pygame.mixer.set_reserved(1)
+            self.ambience_channel = pygame.mixer.Channel(0)
+            self.voices = [[pygame.mixer.Channel(i + 1), None, 0, 0] for i in range(voices)]
+        else:
+            self.ambience_channel = None
+            self.voices = []
+
+    def update(self):
+        self.frame += 1
+
+    def play(self, name):
+        if name not in self.sounds:
+            return None
+        settings = self.settings.get(name, {})
+        last = self.last_played.get(name)
+        if last is not None and (last == self.frame or self.frame - last < settings.get('cooldown', 0)):
+            return None
+
+        priority = settings.get('priority', 0)
+        voice = None
+        for candidate in self.voices:
+            if not candidate[0].get_busy():
+                voice = candidate
+                break
+        else:
+            for candidate in self.voices:
+                if candidate[2] <= priority and (not voice or (candidate[2], candidate[3]) < (voice[2], voice[3])):
+                    voice = candidate
+        if not voice:
+            if counters.enabled:
+                counters.add('audio.dropped')
+            return None
+
+        voice[0].play(self.sounds[name])
+        voice[1:] = [name, priority, self.frame]
+        self.last_played[name] = self.frame
+        return voice[0]
+
+    def play_ambience(self, name):
+        if name in self.sounds:
+            self.ambience_channel.play(self.sounds[name], loops=-1)
@@ -0,0 +1,120 @@
+import json
+import os
+import queue
+import threading
+import time
+
+from scripts.tilemap import write_map
+
+AUTOSAVE_INTERVAL = 30
+
+class MapSaver:
+    """Saves a tilemap on a background thread and journals every edit made since the last full save.
+
+    Full saves serialize a snapshot taken on the calling thread and are written atomically. Edits are
+    appended to path + '.journal' as JSON lines; a full save truncates the journal. Everything goes
+    through one queue, so an edit made after a snapshot always lands in the journal after the save that
+    truncated it, and replaying the journal on top of the saved map reproduces the editor's state.
+    """
+    def __init__(self, tilemap, path, interval=AUTOSAVE_INTERVAL):
+        self.tilemap = tilemap
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.interval = interval
+        self.last_save = time.monotonic()
+        self.dirty = False
+        self.saves = 0
+        self.error = None
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._work, name='map-saver', daemon=True)
+        self.thread.start()
+
+    def recover(self):
+        """Replay a journal left behind by a session that ended without a full save. Returns the number of edits applied."""
+        if not os.path.exists(self.journal_path):
+            return 0
+        applied = 0
+        with open(self.journal_path, 'r') as f:
+            for line in f:
+                try:
+                    edit = json.loads(line)
+                except ValueError:
+                    # a crash mid-append leaves at most one torn line at the end
+                    break
+                apply_edit(self.tilemap, edit)
+                applied += 1
+        self.dirty = self.dirty or bool(applied)
+        return applied
+
+    def record(self, edit):
+        if 'tile' in edit:
+            edit = dict(edit, tile=dict(edit['tile']))
+        self.dirty = True
+        self.queue.put(('edit', edit))
+
+    def save(self):
+        self.dirty = False
+        self.last_save = time.monotonic()
+        self.queue.put(('save', self.tilemap.snapshot()))
+
+    def update(self):
+        """Call once per frame; starts an autosave when there are unsaved edits and the interval has passed."""
+        if self.dirty and time.monotonic() - self.last_save >= self.interval:
+            self.save()
+
+    def close(self, save=True):
+        if save and self.dirty:
+            self.save()
+        self.queue.put(None)
+        self.thread.join()
+
+    def _work(self):
+        journal = open(self.journal_path, 'a')
+        while True:
+            item = self.queue.get()
+            # write everything already queued in one go, flushing the journal once per batch
+            batch = [item]
+            while item is not None:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            for item in batch:
+                if item is None:
+                    journal.close()
+                    return
+                kind, data = item
+                try:
+                    if kind == 'edit':
+                        journal.write(json.dumps(data, separators=(',', ':')) + '\n')
+                    else:
+                        write_map(self.path, data)
+                        journal.truncate(0)
+                        self.saves += 1
+                        self.error = None
+                except Exception as e:
+                    # keep the thread alive and the edits unsaved, so the next autosave or O press retries
+                    self.error = e
+                    self.dirty = True
+            try:
+                journal.flush()
+            except Exception as e:
+                self.error = e
+
+def apply_edit(tilemap, edit):
+    op = edit['op']
+    if op == 'set':
+        tilemap.tilemap[edit['loc']] = edit['tile']
+    elif op == 'remove':
+        tilemap.tilemap.pop(edit['loc'], None)
+    elif op == 'add_offgrid':
+        tilemap.offgrid_tiles.append(edit['tile'])
+    elif op == 'remove_offgrid':
+        for tile in tilemap.offgrid_tiles:
+            if (tile['type'], tile['variant'], list(tile['pos'])) == (edit['tile']['type'], edit['tile']['variant'], list(edit['tile']['pos'])):
+                tilemap.offgrid_tiles.remove(tile)
+                break
+    elif op == 'autotile':
+        tilemap.autotile()
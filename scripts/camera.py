@@ -0,0 +1,29 @@
+class Camera:
+    """The part of the level one rendered frame can show, grown by a margin so sprites reaching in from just off screen still draw.
+
+    Renderers test positions against it before doing any draw work and report what they skipped in culled.
+    """
+    def __init__(self, size, margin=32):
+        self.size = size
+        self.margin = margin
+        self.bounds = (0, 0, 0, 0)
+        self.culled = {}
+
+    def update(self, scroll):
+        self.bounds = (scroll[0] - self.margin, scroll[1] - self.margin,
+                       scroll[0] + self.size[0] + self.margin, scroll[1] + self.size[1] + self.margin)
+        self.culled = {}
+
+    def visible(self, pos):
+        return self.bounds[0] <= pos[0] < self.bounds[2] and self.bounds[1] <= pos[1] < self.bounds[3]
+
+    def cull(self, name, items, pos=lambda item: item.pos):
+        """The items whose position is in view; the number left out is recorded under name."""
+        left, top, right, bottom = self.bounds
+        visible = []
+        for item in items:
+            x, y = pos(item)
+            if left <= x < right and top <= y < bottom:
+                visible.append(item)
+        self.culled[name] = len(items) - len(visible)
+        return visible
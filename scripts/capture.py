@@ -0,0 +1,105 @@
+import queue
+import struct
+import threading
+import time
+import zlib
+
+import pygame
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CAPTURE_MAGIC = b'PLCAP1'
+# file header after the magic: width, height
+HEADER = struct.Struct('<HH')
+# per frame: frame number, milliseconds since capture start, keyframe flag, payload length
+RECORD = struct.Struct('<IIBI')
+# a full frame every so often, so a truncated or partly corrupt file still exports from the next keyframe on
+KEYFRAME_INTERVAL = 120
+CAPTURE_QUEUE_SIZE = 8
+
+def xor_bytes(a, b):
+    if np is not None:
+        # numpy drops the GIL for the loop, so the writer thread stays out of the game loop's way
+        return np.bitwise_xor(np.frombuffer(a, np.uint8), np.frombuffer(b, np.uint8)).tobytes()
+    return (int.from_bytes(a, 'little') ^ int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
+
+class FrameCapture:
+    """Records rendered frames to a file without holding up the game loop.
+
+    grab() copies the frame's pixels and queues them for a writer thread, which stores each frame as the XOR delta
+    against the previous one, deflated: unchanged pixels become long runs of zeros that compress to almost nothing.
+    When the queue is full the frame is dropped and counted instead of waiting for the writer.
+    """
+    def __init__(self, path, size, queue_size=CAPTURE_QUEUE_SIZE):
+        self.path = path
+        self.size = tuple(size)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.frame = 0
+        self.written = 0
+        self.dropped = 0
+        self.start = time.perf_counter()
+        self.file = open(path, 'wb')
+        self.file.write(CAPTURE_MAGIC + HEADER.pack(*self.size))
+        self.thread = threading.Thread(target=self.work, name='capture', daemon=True)
+        self.thread.start()
+
+    def grab(self, surf):
+        pixels = pygame.image.tobytes(surf, 'RGB')
+        try:
+            self.queue.put_nowait((self.frame, int((time.perf_counter() - self.start) * 1000), pixels))
+        except queue.Full:
+            self.dropped += 1
+        self.frame += 1
+
+    def work(self):
+        previous = None
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            frame, ms, pixels = item
+            keyframe = previous is None or self.written % KEYFRAME_INTERVAL == 0
+            payload = zlib.compress(pixels if keyframe else xor_bytes(pixels, previous), 1)
+            self.file.write(RECORD.pack(frame, ms, keyframe, len(payload)))
+            self.file.write(payload)
+            previous = pixels
+            self.written += 1
+
+    def close(self):
+        # the end marker waits behind the queued frames, so everything grabbed so far gets written
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+        print('captured %d frames to %s (%d dropped)' % (self.written, self.path, self.dropped))
+
+def read_capture(path):
+    """The capture's frame size and a generator of (frame number, milliseconds, RGB bytes) for each stored frame."""
+    f = open(path, 'rb')
+    if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+        f.close()
+        raise ValueError(path + ' is not a frame capture')
+    size = HEADER.unpack(f.read(HEADER.size))
+
+    def frames():
+        previous = None
+        with f:
+            while True:
+                record = f.read(RECORD.size)
+                if len(record) < RECORD.size:
+                    return
+                frame, ms, keyframe, length = RECORD.unpack(record)
+                payload = f.read(length)
+                if len(payload) < length:
+                    return
+                pixels = zlib.decompress(payload)
+                if not keyframe:
+                    if previous is None:
+                        continue
+                    pixels = xor_bytes(pixels, previous)
+                previous = pixels
+                yield frame, ms, pixels
+
+    return size, frames()
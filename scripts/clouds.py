@@ -15,11 +15,11 @@ class Cloud:
         surf.blit(self.img, (render_pos[0] % (surf.get_width() + self.img.get_width()) - self.img.get_width(), render_pos[1] % (surf.get_height() + self.img.get_height()) - self.img.get_height()))
 
 class Clouds:
-    def __init__(self, cloud_images, count=16):
+    def __init__(self, cloud_images, count=16, rng=random):
         self.clouds = []
         
         for i in range(count):
-            self.clouds.append(Cloud((random.random() * 99999, random.random() * 99999), random.choice(cloud_images), random.random() * 0.05 + 0.05, random.random() * 0.6 + 0.2))
+            self.clouds.append(Cloud((rng.random() * 99999, rng.random() * 99999), rng.choice(cloud_images), rng.random() * 0.05 + 0.05, rng.random() * 0.6 + 0.2))
             
         self.clouds.sort(key=lambda x: x.depth)
             
@@ -27,6 +27,6 @@ class Clouds:
         for cloud in self.clouds:
             cloud.update()
             
-    def render(self, surf, offset=(0, 0)):
-        for cloud in self.clouds:
+    def render(self, surf, offset=(0, 0), count=None):
+        for cloud in self.clouds[:count]:
             cloud.render(surf, offset=offset)
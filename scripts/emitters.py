@@ -0,0 +1,97 @@
+import bisect
+import math
+
+from scripts.particle import Particle
+from scripts.spark import Spark
+from scripts.telemetry import counters
+
+# live particles across every emitter
+PARTICLE_BUDGET = 1200
+
+# share of the budget each priority may fill: ambient effects give way first, impacts last
+PRIORITY_SHARE = {0: 0.5, 1: 0.8, 2: 1.0}
+
+# particle: animation type; priority: key into PRIORITY_SHARE; frame: range of starting animation frames, which sets
+# the lifetime. Area emitters spawn rate particles per square pixel per frame; bursts spawn count particles flying
+# out up to speed px per frame, each with a spark when spark_speed is given.
+EMITTERS = {
+    'leaf': {'particle': 'leaf', 'priority': 0, 'rate': 1 / 49999, 'velocity': (-0.1, 0.3), 'frame': (0, 20)},
+    'hit': {'particle': 'particle', 'priority': 2, 'count': 30, 'speed': 2.5, 'frame': (0, 7), 'spark_speed': (2, 3)},
+    'dash': {'particle': 'particle', 'priority': 1, 'count': 20, 'speed': (0.5, 1.0), 'frame': (0, 7)},
+    'dash_trail': {'particle': 'particle', 'priority': 1, 'frame': (0, 7)},
+}
+
+def area_errors(emitters, settings=EMITTERS):
+    """What is wrong with a map's emitters list: entries that are not an area emitter type or have no [x, y, w, h] rect."""
+    errors = []
+    for emitter in emitters:
+        name = emitter.get('type')
+        if name not in settings or 'rate' not in settings[name]:
+            errors.append('emitter type %r is not an area emitter (known: %s)'
+                          % (name, ', '.join(sorted(key for key, value in settings.items() if 'rate' in value))))
+        elif not (isinstance(emitter.get('rect'), list) and len(emitter['rect']) == 4):
+            errors.append('%s emitter has no [x, y, w, h] rect: %r' % (name, emitter.get('rect')))
+    return errors
+
+class Emitters:
+    """Spawns particles for area emitters and bursts within a global live-particle budget.
+
+    All area emitters of one kind are sampled together: a single Poisson draw gives the number of spawns this frame,
+    and each spawn picks an emitter weighted by its area, so a level full of trees costs a roll or two per frame
+    instead of one per tree. Randomness comes from game.fx_rng and counts scale with the quality governor.
+    """
+    def __init__(self, game, budget=PARTICLE_BUDGET, settings=EMITTERS):
+        self.game = game
+        self.budget = budget
+        self.settings = settings
+        self.areas = {}
+
+    def set_areas(self, areas):
+        """Replace the area emitters with (name, (x, y, w, h)) pairs, e.g. leaf spawners from a level's trees."""
+        self.areas = {}
+        for name, rect in areas:
+            rects, cumulative = self.areas.setdefault(name, ([], []))
+            rects.append(tuple(rect))
+            cumulative.append((cumulative[-1] if cumulative else 0) + rect[2] * rect[3])
+
+    def allow(self, priority):
+        if len(self.game.particles) < self.budget * PRIORITY_SHARE.get(priority, 1.0):
+            return True
+        if counters.enabled:
+            counters.add('particles.dropped')
+        return False
+
+    def spawn(self, name, pos, velocity):
+        settings = self.settings[name]
+        if self.allow(settings['priority']):
+            frame = self.game.fx_rng.randint(*settings['frame'])
+            self.game.particles.append(Particle(self.game, settings['particle'], pos, velocity=list(velocity), frame=frame))
+
+    def poisson(self, mean):
+        # Knuth's method; the means here stay far below 1, so it usually takes one draw
+        limit = math.exp(-mean)
+        count = 0
+        p = self.game.fx_rng.random()
+        while p > limit:
+            count += 1
+            p *= self.game.fx_rng.random()
+        return count
+
+    def update(self):
+        rng = self.game.fx_rng
+        for name, (rects, cumulative) in self.areas.items():
+            settings = self.settings[name]
+            for _ in range(self.poisson(cumulative[-1] * settings['rate'] * self.game.quality.emission)):
+                rect = rects[bisect.bisect_right(cumulative, rng.random() * cumulative[-1])]
+                self.spawn(name, (rect[0] + rng.random() * rect[2], rect[1] + rng.random() * rect[3]), settings['velocity'])
+
+    def burst(self, name, pos):
+        settings = self.settings[name]
+        rng = self.game.fx_rng
+        speed = settings['speed'] if isinstance(settings['speed'], tuple) else (0, settings['speed'])
+        for _ in range(self.game.quality.count(settings['count'])):
+            angle = rng.random() * math.pi * 2
+            if 'spark_speed' in settings:
+                self.game.sparks.append(Spark(pos, angle + math.pi, rng.uniform(*settings['spark_speed'])))
+            velocity = rng.uniform(*speed)
+            self.spawn(name, pos, (math.cos(angle) * velocity, math.sin(angle) * velocity))
@@ -1,15 +1,16 @@
 import math
-import random
+
 import pygame
 
-from scripts.particle import Particle
 from scripts.spark import Spark
+from scripts.telemetry import counters
 
 class PhysicsEntity:
     def __init__(self, game, e_type, pos, size):
         self.game = game
         self.type = e_type
         self.pos = list(pos)
+        self.last_pos = list(pos)
         self.size = size
         self.velocity = [0, 0]
         self.collisions = {'up': False, 'down': False, 'left': False, 'right': False}
@@ -30,6 +31,7 @@ class PhysicsEntity:
             self.animation = self.game.assets[self.type + '/' + self.action].copy()
     
     def update(self, tilemap, movement=(0, 0)):
+        self.last_pos = list(self.pos)
         self.collisions = {'up': False, 'down': False, 'left': False, 'right': False}
         
         frame_movement = (movement[0] + self.velocity[0], movement[1] + self.velocity[1])
@@ -73,6 +75,8 @@ class PhysicsEntity:
         self.animation.update()   
         
     def render(self, surf, offset=[0, 0]):
+        if counters.enabled:
+            counters.add('surfaces.flip')
         surf.blit(pygame.transform.flip(self.animation.img(), self.flip, False), (self.pos[0] - offset[0] + self.anim_offset[0], self.pos[1] - offset[1] + self.anim_offset[1]))
         
 class Enemy(PhysicsEntity):
@@ -80,10 +84,25 @@ class Enemy(PhysicsEntity):
         super().__init__(game, 'enemy', pos, size)
         
         self.walking = 0
+        self.segment = None
+        self.segment_generation = None
+
+    def ground_ahead(self, tilemap, pos):
+        # a range check against the segment walked on last, trusted only while the table has not changed since;
+        # the table is consulted when stepping off it
+        col, row = int(pos[0] // tilemap.tile_size), int(pos[1] // tilemap.tile_size)
+        patrol = tilemap.navigation()
+        if self.segment and self.segment_generation == patrol.generation and self.segment.contains(col, row):
+            return True
+        segment = patrol.segment_at(col, row)
+        if segment:
+            self.segment = segment
+            self.segment_generation = patrol.generation
+        return segment is not None
         
     def update(self, tilemap, movement=(0, 0)):
         if self.walking:
-            if tilemap.solid_check((self.rect().centerx + (-7 if self.flip else 7), self.pos[1] + 23)):
+            if self.ground_ahead(tilemap, (self.rect().centerx + (-7 if self.flip else 7), self.pos[1] + 23)):
                 if (self.collisions['right'] or self.collisions['left']):
                     self.flip = not self.flip
                 else:
@@ -93,19 +112,19 @@ class Enemy(PhysicsEntity):
             self.walking = max(0, self.walking - 1)
             if not self.walking:
                 dis = (self.game.player.pos[0] - self.pos[0], self.game.player.pos[1] - self.pos[1])
-                if (abs(dis[1]) < 16):
+                if (abs(dis[1]) < 16) and tilemap.line_of_sight(self.rect().center, self.game.player.rect().center):
                     if (self.flip and dis[0] < 0):
-                        self.game.sfx['shoot'].play()
+                        self.game.audio.play('shoot')
                         self.game.projectiles.append([[self.rect().centerx - 7, self.rect().centery], -1.5, 0])
-                        for i in range(4):
-                            self.game.sparks.append(Spark(self.game.projectiles[-1][0], random.random() - 0.5 + math.pi, 2 + random.random()))
+                        for i in range(self.game.quality.count(4)):
+                            self.game.sparks.append(Spark(self.game.projectiles[-1][0], self.game.fx_rng.random() - 0.5 + math.pi, 2 + self.game.fx_rng.random()))
                     if (not self.flip and dis[0] > 0):
-                        self.game.sfx['shoot'].play()
+                        self.game.audio.play('shoot')
                         self.game.projectiles.append([[self.rect().centerx + 7, self.rect().centery], 1.5, 0])
-                        for i in range(4):
-                            self.game.sparks.append(Spark(self.game.projectiles[-1][0], random.random() - 0.5, 2 + random.random()))
-        elif random.random() < 0.01:
-            self.walking = random.randint(30, 120)
+                        for i in range(self.game.quality.count(4)):
+                            self.game.sparks.append(Spark(self.game.projectiles[-1][0], self.game.fx_rng.random() - 0.5, 2 + self.game.fx_rng.random()))
+        elif self.game.rng.random() < 0.01:
+            self.walking = self.game.rng.randint(30, 120)
         super().update(tilemap, movement=movement)   
         
         if movement[0] != 0: 
@@ -116,20 +135,18 @@ class Enemy(PhysicsEntity):
         if abs(self.game.player.dashing) >= 50:
             if self.rect().colliderect(self.game.player.rect()):
                 self.game.screenshake = max(16, self.game.screenshake)
-                self.game.sfx['hit'].play()
-                for i in range(30):
-                    angle = random.random() * math.pi * 2
-                    speed = random.random() * 5
-                    self.game.sparks.append(Spark(self.rect().center, angle, 2 + random.random()))
-                    self.game.particles.append(Particle(self.game, 'particle', self.rect().center, velocity=[math.cos(angle + math.pi) * speed * 0.5, math.sin(angle + math.pi) * speed * 0.5], frame=random.randint(0, 7)))
-                self.game.sparks.append(Spark(self.rect().center, 0, 5 + random.random()))   
-                self.game.sparks.append(Spark(self.rect().center, math.pi, 5 + random.random()))     
+                self.game.audio.play('hit')
+                self.game.emitters.burst('hit', self.rect().center)
+                self.game.sparks.append(Spark(self.rect().center, 0, 5 + self.game.fx_rng.random()))   
+                self.game.sparks.append(Spark(self.rect().center, math.pi, 5 + self.game.fx_rng.random()))     
                 return True
             
     def render(self, surf, offset=(0, 0)):  
         super().render(surf, offset=offset)  
         
         if self.flip:
+            if counters.enabled:
+                counters.add('surfaces.flip')
             surf.blit(pygame.transform.flip(self.game.assets['gun'], True, False), (self.rect().centerx - 4 - self.game.assets['gun'].get_width() - offset[0], self.rect().centery - offset[1]))
         else:
             surf.blit(self.game.assets['gun'], (self.rect().centerx + 4 - offset[0], self.rect().centery - offset[1]))
@@ -176,11 +193,7 @@ class Player(PhysicsEntity):
                 self.set_action('idle')
         
         if abs(self.dashing) in {60, 50}:
-            for i in range(20):
-                angle = random.random() * math.pi * 2
-                speed = random.random() * 0.5 + 0.5
-                pvelocity = [math.cos(angle) * speed, math.sin(angle) * speed]
-                self.game.particles.append(Particle(self.game, 'particle', self.rect().center, velocity=pvelocity, frame=random.randint(0, 7)))
+            self.game.emitters.burst('dash', self.rect().center)
                 
         if self.dashing > 0:
             self.dashing = max(0, self.dashing - 1)
@@ -190,8 +203,8 @@ class Player(PhysicsEntity):
             self.velocity[0] = abs(self.dashing) / self.dashing * 8
             if abs(self.dashing) == 51:
                 self.velocity[0] *= 0.1
-            pvelocity = [abs(self.dashing) / self.dashing * random.random() * 3, 0]
-            self.game.particles.append(Particle(self.game, 'particle', self.rect().center, velocity=pvelocity, frame=random.randint(0, 7)))
+            pvelocity = [abs(self.dashing) / self.dashing * self.game.fx_rng.random() * 3, 0]
+            self.game.emitters.spawn('dash_trail', self.rect().center, pvelocity)
                 
         if self.velocity[0] > 0:
             self.velocity[0] = max(self.velocity[0] - 0.1, 0)
@@ -223,7 +236,7 @@ class Player(PhysicsEntity):
         
     def dash(self):
         if not self.dashing:
-            self.game.sfx['dash'].play()
+            self.game.audio.play('dash')
             if self.flip:
                 self.dashing = -60
             else:
@@ -0,0 +1,152 @@
+import glob
+import os
+import queue
+import threading
+
+import pygame
+
+from scripts.entities import Enemy
+from scripts.utils import BASE_IMG_PATH, Animation
+
+# seconds between scans of the watched files
+WATCH_INTERVAL = 0.5
+WATCH_PATTERNS = ['data/maps/*.json', BASE_IMG_PATH + '**/*.png']
+
+class FileWatcher:
+    """Polls files matching glob patterns on a background thread and queues the paths whose mtime or size changed."""
+    def __init__(self, patterns=WATCH_PATTERNS, interval=WATCH_INTERVAL):
+        self.patterns = patterns
+        self.interval = interval
+        self.stats = self.scan()
+        self.changes = queue.Queue()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.work, name='watcher', daemon=True)
+        self.thread.start()
+
+    def scan(self):
+        stats = {}
+        for pattern in self.patterns:
+            for path in glob.glob(pattern, recursive=True):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                stats[path.replace(os.sep, '/')] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+    def work(self):
+        while not self.stopped.wait(self.interval):
+            stats = self.scan()
+            for path in set(stats) | set(self.stats):
+                if stats.get(path) != self.stats.get(path):
+                    self.changes.put(path)
+            self.stats = stats
+
+    def poll(self):
+        paths = []
+        while True:
+            try:
+                path = self.changes.get_nowait()
+            except queue.Empty:
+                return paths
+            if path not in paths:
+                paths.append(path)
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+
+class HotReloader:
+    """Applies edited maps and images to a running game.
+
+    An edit to the current level's map is diffed against the live tilemap and only the changed cells are
+    replaced, through set_tile/remove_tile so the solid, patrol and occupancy tables update incrementally;
+    the player keeps its position unless it is now inside a wall. Any other map only has its cached snapshot replaced.
+    A map that fails to parse changes nothing.
+    An edited image is rebuilt under every asset name that uses it, and lists and animations are updated in place
+    so the entities and particles already holding them pick it up too.
+    """
+    def __init__(self, game, interval=WATCH_INTERVAL):
+        self.game = game
+        self.watcher = FileWatcher(interval=interval)
+
+    def update(self):
+        paths = self.watcher.poll()
+        for path in paths:
+            if path.endswith('.json'):
+                self.attempt(self.reload_map, path)
+        images = [path for path in paths if not path.endswith('.json')]
+        if images:
+            self.attempt(self.reload_images, images)
+
+    def attempt(self, reload, paths):
+        try:
+            reload(paths)
+        except (OSError, ValueError, KeyError, IndexError, pygame.error) as error:
+            # most likely caught mid-write; the next save triggers another reload
+            print('hot reload of %s failed: %s' % (paths, error))
+
+    def reload_map(self, path):
+        game = self.game
+        stem = os.path.splitext(os.path.basename(path))[0]
+        map_id = int(stem) if stem.isdigit() else stem
+        if not os.path.exists(path):
+            game.level_snapshots.pop(map_id, None)
+            return
+        # parsed before anything is replaced, so a map caught mid-edit leaves the cached snapshot in place
+        snapshot = game.parse_level(map_id)
+        old = game.level_snapshots.get(map_id)
+        game.level_snapshots[map_id] = snapshot
+        if map_id != game.loaded_level:
+            return
+
+        tilemap = game.tilemap
+        if snapshot.tile_size != tilemap.tile_size:
+            pos = list(game.player.pos)
+            snapshot.restore(game)
+            game.player.pos = pos
+            changed = len(snapshot.tilemap)
+        else:
+            changed = 0
+            for loc in set(tilemap.tilemap) | set(snapshot.tilemap):
+                tile = snapshot.tilemap.get(loc)
+                if tile != tilemap.tilemap.get(loc):
+                    if tile:
+                        tilemap.set_tile(loc, tile)
+                    else:
+                        tilemap.remove_tile(loc)
+                    changed += 1
+            tilemap.offgrid_tiles = list(snapshot.offgrid_tiles)
+            game.emitters.set_areas(snapshot.emitters)
+            if not old or old.enemy_spawns != snapshot.enemy_spawns:
+                game.enemies = [Enemy(game, pos, (8, 15)) for pos in snapshot.enemy_spawns]
+
+        player = game.player
+        if snapshot.player_spawn and tilemap.any_solid_in_boxes([tuple(player.rect())])[0]:
+            player.pos = list(snapshot.player_spawn)
+            player.velocity = [0, 0]
+        player.last_pos = list(player.pos)
+        print('reloaded map %s: %d tiles changed' % (map_id, changed))
+
+    def reload_images(self, paths):
+        game = self.game
+        image_paths = [path[len(BASE_IMG_PATH):] for path in paths]
+        # a directory of frames saved together rebuilds its asset once
+        names = [name for name, spec in game.assets.manifest.items() if name in game.assets and
+                 any(image_path == spec['path'] or image_path.startswith(spec['path'] + '/') for image_path in image_paths)]
+        for name in names:
+            old = game.assets.pop(name)
+            new = game.assets[name]
+            if isinstance(old, Animation):
+                old.images[:] = new.images
+                game.assets[name] = old
+            elif isinstance(old, list):
+                old[:] = new
+                game.assets[name] = old
+        # menu screens scale their images once, so they are rebuilt on next show
+        game.menu.prepared = {}
+        if names:
+            print('reloaded ' + ', '.join(names))
+
+    def close(self):
+        self.watcher.close()
@@ -0,0 +1,174 @@
+import json
+
+import pygame
+
+from scripts.utils import load_images, Animation
+
+MENU_CONFIG_PATH = 'data/menu_config.json'
+
+class Menu:
+    """Screens defined in menu_config.json as layers of fill, image, animation and text elements,
+    plus the keys that leave each screen and the action each key returns. An image with an action is a button
+    that returns it when clicked, drawn enlarged by its hover_scale while the pointer is over it.
+
+    A screen's images are loaded and scaled the first time it is shown and all text goes through the game's
+    TextCache, so drawing a menu frame after the first is blits only. Each screen declares the asset groups it
+    owns, to prefetch before it is shown and to evict once gameplay no longer needs it (persistent screens are
+    kept); evicting an asset drops the prepared screens that use it, so their scaled copies are released with it.
+    """
+    def __init__(self, game, path=MENU_CONFIG_PATH):
+        self.game = game
+        with open(path, 'r') as f:
+            self.screens = json.load(f)['screens']
+        self.prepared = {}
+        game.assets.evict_listeners.append(self.release)
+
+    def prefetch(self, *names):
+        for name in names:
+            self.game.assets.prefetch(*self.screens[name].get('groups', []))
+
+    def evict(self):
+        for screen in self.screens.values():
+            if not screen.get('persistent'):
+                self.game.assets.evict_group(*screen.get('groups', []))
+
+    def release(self, names):
+        for name in list(self.prepared):
+            if any(self.uses(element, names) for element in self.screens[name]['elements']):
+                del self.prepared[name]
+
+    def uses(self, element, names):
+        return element.get('asset') in names or ('fallback' in element and self.uses(element['fallback'], names))
+
+    def prepare(self, name):
+        if name not in self.prepared:
+            layers = []
+            anchors = {}
+            for element in self.screens[name]['elements']:
+                layer = self.prepare_element(element, anchors)
+                if layer:
+                    layers.append(layer)
+            self.prepared[name] = (layers, anchors)
+        return self.prepared[name]
+
+    def prepare_element(self, element, anchors):
+        kind = element['type']
+        if kind == 'fill':
+            return (element, kind, tuple(element['color']))
+
+        if kind == 'image':
+            img = self.load(element)
+            if img is None:
+                return self.prepare_element(element['fallback'], anchors) if 'fallback' in element else None
+            if element.get('fit'):
+                dw, dh = self.game.display.get_size()
+                scale = min(dw / img.get_width(), dh / img.get_height())
+                img = pygame.transform.smoothscale(img, (max(1, int(img.get_width() * scale)), max(1, int(img.get_height() * scale))))
+            elif 'size' in element:
+                img = pygame.transform.smoothscale(img, tuple(element['size']))
+            rect = img.get_rect(topleft=self.place(img.get_size(), element))
+            if 'id' in element:
+                anchors[element['id']] = rect
+            hover = None
+            if 'hover_scale' in element:
+                hover_img = pygame.transform.scale(img, (int(img.get_width() * element['hover_scale']), int(img.get_height() * element['hover_scale'])))
+                hover = (hover_img, hover_img.get_rect(center=rect.center).topleft)
+            return (element, kind, (img, rect, hover))
+
+        if kind == 'animation':
+            try:
+                animation = self.game.assets.get(element['asset'])
+                animation = animation.copy() if isinstance(animation, Animation) else Animation(load_images(element['path'], rle=False), img_dur=6)
+            except Exception:
+                return None
+            anchor = anchors.get(element.get('anchor'))
+            offset = element.get('offset', (0, 0))
+            center = (anchor.midbottom[0] + offset[0], anchor.midbottom[1] + offset[1]) if anchor else tuple(element['pos'])
+            if 'id' in element:
+                anchors[element['id']] = pygame.Rect(center, (0, 0))
+            return (element, kind, (animation, center))
+
+        if kind == 'text':
+            return (element, kind, None)
+        raise ValueError('unknown menu element type: ' + kind)
+
+    def load(self, element):
+        # every image comes from the asset manifest, so it is decoded through the pipeline and its cache
+        try:
+            img = self.game.assets.get(element['asset'])
+        except Exception:
+            return None
+        if isinstance(img, list):
+            img = img[element.get('variant', 0)]
+        return img
+
+    def place(self, size, element):
+        """Top-left for an element of size: a null coordinate in pos centres it on that axis."""
+        dw, dh = self.game.display.get_size()
+        pos = element.get('pos', (None, None))
+        offset = element.get('offset', (0, 0))
+        x = (dw - size[0]) // 2 if pos[0] is None else pos[0]
+        y = (dh - size[1]) // 2 if pos[1] is None else pos[1]
+        return (x + offset[0], y + offset[1])
+
+    def anchor(self, name, element_id):
+        return self.prepare(name)[1].get(element_id)
+
+    def update(self, name):
+        for element, kind, data in self.prepare(name)[0]:
+            if kind == 'animation':
+                data[0].update()
+
+    def draw(self, name, surf=None, skip=(), pointer=None):
+        """Draw a screen; pointer is the mouse position in display pixels, for button hover."""
+        if surf is None:
+            surf = self.game.display
+        ticks = pygame.time.get_ticks()
+        for element, kind, data in self.prepare(name)[0]:
+            if element.get('id') in skip:
+                continue
+            if element.get('blink') and (ticks // element['blink']) % 2:
+                continue
+            if kind == 'fill':
+                surf.fill(data)
+            elif kind == 'image':
+                surf.blit(data[0], data[1])
+                if data[2] and pointer and data[1].collidepoint(pointer):
+                    surf.blit(*data[2])
+            elif kind == 'animation':
+                img = data[0].img()
+                surf.blit(img, (data[1][0] - img.get_width() // 2, data[1][1] - img.get_height() // 2))
+            else:
+                shadow = element.get('shadow')
+                text = self.game.text.render(element['text'], element['size'], element.get('color', (255, 255, 255)),
+                                             scale=element.get('scale', 1), shadow=shadow)
+                # the shadow pads the surface by a pixel; place the text itself
+                size = (text.get_width() - 1, text.get_height() - 1) if shadow else text.get_size()
+                surf.blit(text, self.place(size, element))
+
+    def action(self, name, event, pointer=None):
+        """The action an event triggers on a screen: one of its keys, or a click on one of its buttons."""
+        if event.type == pygame.KEYDOWN:
+            for key, action in self.screens[name]['keys'].items():
+                if event.key == pygame.key.key_code(key):
+                    return action
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and pointer:
+            for element, kind, data in self.prepare(name)[0]:
+                if kind == 'image' and 'action' in element and data[1].collidepoint(pointer):
+                    return element['action']
+        return None
+
+    def run(self, name):
+        """Show a screen until one of its keys is pressed and return that key's action."""
+        screen = self.screens[name]
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.game.quit()
+                action = self.action(name, event)
+                if action:
+                    return action
+            self.update(name)
+            self.draw(name)
+            self.game.present(self.game.display)
+            self.game.clock.tick(screen.get('fps', 60))
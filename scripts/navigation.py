@@ -0,0 +1,73 @@
+import itertools
+
+# table generations are unique across tables, so a rebuilt table never repeats one a cached segment was taken from
+GENERATIONS = itertools.count()
+
+class Segment:
+    """A maximal horizontal run of solid tiles that enemies can patrol along, from column x0 to x1 inclusive."""
+    __slots__ = ('row', 'x0', 'x1', 'left_wall', 'right_wall')
+
+    def __init__(self, row, x0, x1, left_wall=False, right_wall=False):
+        self.row = row
+        self.x0 = x0
+        self.x1 = x1
+        # whether the run ends against a solid tile one row up rather than at a ledge
+        self.left_wall = left_wall
+        self.right_wall = right_wall
+
+    def contains(self, col, row):
+        return row == self.row and self.x0 <= col <= self.x1
+
+    def extents(self, tile_size):
+        return (self.x0 * tile_size, (self.x1 + 1) * tile_size)
+
+class PatrolTable:
+    """Walkable surface segments of a tilemap, grouped by row and indexed by cell.
+
+    Built once per level from the tilemap's set of solid cells, which it shares; after a cell changes,
+    update() rebuilds only the rows the change affects. generation changes with every update, so callers holding
+    on to a segment can tell whether it may be stale.
+    """
+    def __init__(self, solid):
+        self.solid = solid
+        self.generation = next(GENERATIONS)
+        self.row_cols = {}
+        for col, row in self.solid:
+            self.row_cols.setdefault(row, set()).add(col)
+        self.rows = {}
+        self.cells = {}
+        for row in self.row_cols:
+            self.build_row(row)
+
+    def build_row(self, row):
+        for segment in self.rows.pop(row, []):
+            for col in range(segment.x0, segment.x1 + 1):
+                del self.cells[(col, row)]
+
+        segments = []
+        for col in sorted(self.row_cols.get(row, ())):
+            if segments and segments[-1].x1 == col - 1:
+                segments[-1].x1 = col
+            else:
+                segments.append(Segment(row, col, col))
+        for segment in segments:
+            segment.left_wall = (segment.x0 - 1, row - 1) in self.solid
+            segment.right_wall = (segment.x1 + 1, row - 1) in self.solid
+            for col in range(segment.x0, segment.x1 + 1):
+                self.cells[(col, row)] = segment
+        if segments:
+            self.rows[row] = segments
+
+    def update(self, col, row):
+        self.generation = next(GENERATIONS)
+        cols = self.row_cols.setdefault(row, set())
+        if (col, row) in self.solid:
+            cols.add(col)
+        else:
+            cols.discard(col)
+        # walls of the row below look one row up, so it changes too
+        self.build_row(row)
+        self.build_row(row + 1)
+
+    def segment_at(self, col, row):
+        return self.cells.get((col, row))
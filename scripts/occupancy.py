@@ -0,0 +1,90 @@
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# cells of slack added around the level when the grid is (re)allocated, so edits near the edge rarely resize it
+GRID_PADDING = 16
+
+class OccupancyGrid:
+    """A NumPy bitmap of solid cells with vectorized point, box and column queries. Requires numpy.
+
+    Cell (x, y) lives at bitmap[y - origin[1], x - origin[0]]; anything outside the bitmap is empty.
+    A summed-area table for box queries is rebuilt lazily after edits.
+    """
+    def __init__(self, solid, tile_size):
+        self.tile_size = tile_size
+        self.sums = None
+        self.allocate(solid)
+
+    def allocate(self, solid):
+        if solid:
+            xs = [cell[0] for cell in solid]
+            ys = [cell[1] for cell in solid]
+            self.origin = (min(xs) - GRID_PADDING, min(ys) - GRID_PADDING)
+            shape = (max(ys) - min(ys) + 1 + GRID_PADDING * 2, max(xs) - min(xs) + 1 + GRID_PADDING * 2)
+        else:
+            self.origin = (-GRID_PADDING, -GRID_PADDING)
+            shape = (GRID_PADDING * 2, GRID_PADDING * 2)
+        self.bitmap = np.zeros(shape, dtype=bool)
+        if solid:
+            cells = np.array(list(solid), dtype=np.int64)
+            self.bitmap[cells[:, 1] - self.origin[1], cells[:, 0] - self.origin[0]] = True
+        self.sums = None
+
+    def set(self, x, y, solid):
+        col, row = x - self.origin[0], y - self.origin[1]
+        if not (0 <= row < self.bitmap.shape[0] and 0 <= col < self.bitmap.shape[1]):
+            if not solid:
+                return
+            cells = {(int(cx) + self.origin[0], int(cy) + self.origin[1]) for cy, cx in zip(*np.nonzero(self.bitmap))}
+            cells.add((x, y))
+            self.allocate(cells)
+            return
+        self.bitmap[row, col] = solid
+        self.sums = None
+
+    def cells(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        cols = np.floor(points[:, 0] / self.tile_size).astype(np.int64) - self.origin[0]
+        rows = np.floor(points[:, 1] / self.tile_size).astype(np.int64) - self.origin[1]
+        return cols, rows
+
+    def solid_at(self, points):
+        """Whether each (x, y) pixel position is inside a solid tile."""
+        cols, rows = self.cells(points)
+        inside = (rows >= 0) & (rows < self.bitmap.shape[0]) & (cols >= 0) & (cols < self.bitmap.shape[1])
+        result = np.zeros(len(cols), dtype=bool)
+        result[inside] = self.bitmap[rows[inside], cols[inside]]
+        return result
+
+    def any_solid_in_boxes(self, boxes):
+        """Whether each (x, y, w, h) pixel box overlaps a solid tile."""
+        if self.sums is None:
+            self.sums = np.zeros((self.bitmap.shape[0] + 1, self.bitmap.shape[1] + 1), dtype=np.int32)
+            self.sums[1:, 1:] = self.bitmap.cumsum(axis=0).cumsum(axis=1)
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        height, width = self.bitmap.shape
+        # the last cell a box touches is the one holding its far edge, exclusive
+        x0 = np.clip(np.floor(boxes[:, 0] / self.tile_size).astype(np.int64) - self.origin[0], 0, width)
+        y0 = np.clip(np.floor(boxes[:, 1] / self.tile_size).astype(np.int64) - self.origin[1], 0, height)
+        x1 = np.clip(np.ceil((boxes[:, 0] + boxes[:, 2]) / self.tile_size).astype(np.int64) - self.origin[0], 0, width)
+        y1 = np.clip(np.ceil((boxes[:, 1] + boxes[:, 3]) / self.tile_size).astype(np.int64) - self.origin[1], 0, height)
+        x1 = np.maximum(x0, x1)
+        y1 = np.maximum(y0, y1)
+        total = self.sums[y1, x1] - self.sums[y0, x1] - self.sums[y1, x0] + self.sums[y0, x0]
+        return total > 0
+
+    def column_heights(self, xs):
+        """Pixel y of the top of the highest solid tile in the column under each x, or inf for empty columns."""
+        cols, _ = self.cells([(x, 0) for x in xs])
+        result = np.full(len(cols), math.inf)
+        inside = (cols >= 0) & (cols < self.bitmap.shape[1])
+        columns = self.bitmap[:, cols[inside]]
+        filled = columns.any(axis=0)
+        tops = np.argmax(columns, axis=0)
+        heights = np.where(filled, (tops + self.origin[1]) * self.tile_size, math.inf)
+        result[inside] = heights
+        return result
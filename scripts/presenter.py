@@ -0,0 +1,94 @@
+import threading
+
+import pygame
+
+from scripts.telemetry import counters
+from scripts.utils import make_surface, SURFACE_OPAQUE
+
+class Presenter:
+    """Scales finished frames up to the window and flips them, optionally on a worker thread.
+
+    Threaded, present() copies the frame into one of two back buffers and returns, so the main thread simulates
+    the next frame while the worker scales and flips this one; pygame drops the GIL inside those SDL calls. At most
+    one frame waits behind the one being flipped, and present() blocks until the worker has taken it, so the two
+    never share a buffer. If the worker fails (some platforms only allow presenting from the main thread) the
+    presenter falls back to flipping synchronously.
+    """
+    def __init__(self, screen, size, threaded=False):
+        self.screen = screen
+        self.threaded = threaded
+        self.error = None
+        self.condition = threading.Condition()
+        self.pending = None
+        self.busy = False
+        self.closing = False
+        self.thread = None
+        if threaded:
+            self.buffers = [make_surface(size, SURFACE_OPAQUE) for _ in range(2)]
+            self.index = 0
+            self.thread = threading.Thread(target=self.work, name='present', daemon=True)
+            self.thread.start()
+
+    def flip(self, surf, offset):
+        if counters.enabled:
+            counters.add('surfaces.scale')
+        self.screen.blit(pygame.transform.scale(surf, self.screen.get_size()), offset)
+        pygame.display.update()
+
+    def present(self, surf, offset=(0, 0)):
+        if not self.threaded:
+            self.flip(surf, offset)
+            return
+        with self.condition:
+            while self.pending is not None and self.threaded:
+                self.condition.wait()
+        if not self.threaded:
+            self.flip(surf, offset)
+            return
+        # the worker holds at most the other buffer now, so this one is free to overwrite
+        buffer = self.buffers[self.index]
+        self.index ^= 1
+        buffer.blit(surf, (0, 0))
+        with self.condition:
+            self.pending = (buffer, offset)
+            self.condition.notify_all()
+
+    def work(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closing:
+                    self.condition.wait()
+                if self.pending is None:
+                    return
+                buffer, offset = self.pending
+                self.pending = None
+                self.busy = True
+                self.condition.notify_all()
+            try:
+                self.flip(buffer, offset)
+            except pygame.error as error:
+                print('threaded present failed, presenting on the main thread: %s' % error)
+                with self.condition:
+                    self.error = error
+                    self.threaded = False
+                    self.busy = False
+                    self.condition.notify_all()
+                return
+            with self.condition:
+                self.busy = False
+                self.condition.notify_all()
+
+    def sync(self):
+        """Wait until every handed-over frame is on screen, e.g. before touching the window from the main thread."""
+        with self.condition:
+            while (self.pending is not None or self.busy) and self.threaded:
+                self.condition.wait()
+
+    def close(self):
+        if self.thread:
+            self.sync()
+            with self.condition:
+                self.closing = True
+                self.condition.notify_all()
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,108 @@
+import statistics
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pygame
+
+from scripts.utils import make_surface, SURFACE_ALPHA
+
+FRAME_BUDGET_MS = 1000 / 60
+
+def percentiles(samples):
+    """Mean, p50, p95, p99 and max of a list of timings, as reported by the benchmarks and level validation."""
+    ordered = sorted(samples)
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {'mean': statistics.fmean(ordered), 'p50': pick(0.5), 'p95': pick(0.95), 'p99': pick(0.99), 'max': ordered[-1]}
+
+class FrameProfiler:
+    """Times the phases of each frame into a ring buffer of recent frames and draws them as an overlay.
+
+    When disabled, Game skips the timed code paths entirely, so the only cost is one attribute check per frame.
+    """
+    def __init__(self, history=600, enabled=False):
+        self.enabled = enabled
+        self.visible = enabled
+        self.frames = deque(maxlen=history)
+        self.current = {}
+        self.frame_start = 0
+        self.font = None
+        self.panel = None
+        # per-frame object counts shown under the graph, e.g. what the camera culled
+        self.counts = {}
+
+    def begin_frame(self):
+        self.current = {}
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        self.current['frame'] = (time.perf_counter() - self.frame_start) * 1000
+        self.frames.append(self.current)
+
+    def add(self, name, ms):
+        self.current[name] = self.current.get(name, 0) + ms
+
+    def run(self, phases, prefix=''):
+        for name, phase in phases:
+            start = time.perf_counter()
+            phase()
+            self.add(prefix + name, (time.perf_counter() - start) * 1000)
+
+    @contextmanager
+    def scope(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def averages(self, frames=60):
+        recent = list(self.frames)[-frames:]
+        totals = {}
+        for frame in recent:
+            for name, ms in frame.items():
+                totals[name] = totals.get(name, 0) + ms
+        return {name: total / max(1, len(recent)) for name, total in totals.items()}
+
+    def export_csv(self, path):
+        names = []
+        for frame in self.frames:
+            for name in frame:
+                if name not in names and name != 'frame':
+                    names.append(name)
+        with open(path, 'w') as f:
+            f.write(','.join(['frame', 'frame_ms'] + names) + '\n')
+            for i, frame in enumerate(self.frames):
+                f.write(','.join([str(i), '%.4f' % frame.get('frame', 0)] + ['%.4f' % frame.get(name, 0) for name in names]) + '\n')
+
+    def render(self, surf):
+        if not self.font:
+            self.font = pygame.font.Font(None, 12)
+            self.panel = make_surface((surf.get_width(), 70), SURFACE_ALPHA)
+            self.panel.fill((0, 0, 0, 170))
+        top = surf.get_height() - self.panel.get_height()
+        surf.blit(self.panel, (0, top))
+
+        # frame-time graph: one column per frame, full height is two frame budgets
+        graph_h = 50
+        base = top + 10 + graph_h
+        for i, frame in enumerate(list(self.frames)[-120:]):
+            ms = frame.get('frame', 0)
+            h = min(graph_h, int(ms / (FRAME_BUDGET_MS * 2) * graph_h))
+            color = (90, 220, 90) if ms <= FRAME_BUDGET_MS else (240, 80, 60)
+            pygame.draw.line(surf, color, (2 + i, base), (2 + i, base - h))
+        budget_y = base - graph_h // 2
+        pygame.draw.line(surf, (255, 255, 255), (2, budget_y), (122, budget_y))
+        averages = self.averages()
+        surf.blit(self.font.render('%.2f ms' % averages.get('frame', 0), True, (255, 255, 255)), (4, top + 1))
+        if self.counts:
+            text = ' '.join('%s %d' % (name[:2], count) for name, count in self.counts.items())
+            surf.blit(self.font.render('culled ' + text, True, (200, 200, 200)), (4, top + 61))
+
+        # slowest phases averaged over the last second, one px per 0.1 ms
+        phases = sorted(((ms, name) for name, ms in averages.items() if name != 'frame'), reverse=True)[:6]
+        for row, (ms, name) in enumerate(phases):
+            y = top + 4 + row * 11
+            pygame.draw.rect(surf, (80, 140, 230), (250, y + 1, min(68, int(ms * 10)), 7))
+            surf.blit(self.font.render('%s %.2f' % (name, ms), True, (255, 255, 255)), (128, y))
@@ -0,0 +1,80 @@
+from collections import deque
+
+# cosmetic settings from best to cheapest: fraction of particles/sparks emitted, the silhouette outline pass,
+# clouds drawn and render frames between screenshake offset samples
+QUALITY_LEVELS = {
+    'high': {'emission': 1.0, 'outline': True, 'clouds': 16, 'shake_interval': 1},
+    'medium': {'emission': 0.6, 'outline': True, 'clouds': 10, 'shake_interval': 1},
+    'low': {'emission': 0.35, 'outline': False, 'clouds': 6, 'shake_interval': 2},
+    'minimum': {'emission': 0.15, 'outline': False, 'clouds': 3, 'shake_interval': 4},
+}
+QUALITY_ORDER = ['high', 'medium', 'low', 'minimum']
+
+class QualityGovernor:
+    """Steps cosmetic quality down when recent frames run over budget and back up when there is headroom.
+
+    Only effects drawn from game.fx_rng or done at render time are scaled, so the simulation is identical at every level.
+    """
+    def __init__(self, budget_ms=1000 / 60, level='high', adaptive=True, window=30, headroom=0.6, upgrade_delay=180):
+        self.budget_ms = budget_ms
+        self.index = QUALITY_ORDER.index(level)
+        self.adaptive = adaptive
+        self.samples = deque(maxlen=window)
+        self.headroom = headroom
+        self.upgrade_delay = upgrade_delay
+        self.cooldown = 0
+        self.changes = 0
+
+    @property
+    def level(self):
+        return QUALITY_ORDER[self.index]
+
+    @property
+    def settings(self):
+        return QUALITY_LEVELS[self.level]
+
+    @property
+    def emission(self):
+        return self.settings['emission']
+
+    @property
+    def outline(self):
+        return self.settings['outline']
+
+    @property
+    def clouds(self):
+        return self.settings['clouds']
+
+    @property
+    def shake_interval(self):
+        return self.settings['shake_interval']
+
+    def count(self, n):
+        """How many of a burst of n cosmetic effects to emit."""
+        return max(1, int(n * self.settings['emission'] + 0.5))
+
+    def set_level(self, level):
+        self.index = QUALITY_ORDER.index(level)
+        self.samples.clear()
+
+    def observe(self, frame_ms):
+        """Feed the work time of one rendered frame, excluding time spent waiting on the frame cap."""
+        if not self.adaptive:
+            return
+        self.samples.append(frame_ms)
+        self.cooldown = max(0, self.cooldown - 1)
+        if self.cooldown or len(self.samples) < self.samples.maxlen:
+            return
+
+        slow = sorted(self.samples)[int(len(self.samples) * 0.9)]
+        if slow > self.budget_ms and self.index < len(QUALITY_ORDER) - 1:
+            self.index += 1
+            self.cooldown = self.samples.maxlen
+        elif slow < self.budget_ms * self.headroom and self.index > 0:
+            # climbing back up waits longer so quality does not oscillate around the budget
+            self.index -= 1
+            self.cooldown = self.upgrade_delay
+        else:
+            return
+        self.changes += 1
+        self.samples.clear()
@@ -0,0 +1,57 @@
+import json
+
+REPLAY_VERSION = 2
+
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_JUMP = 4
+INPUT_DASH = 8
+
+def pack_input(left, right, jump=False, dash=False):
+    return (INPUT_LEFT if left else 0) | (INPUT_RIGHT if right else 0) | (INPUT_JUMP if jump else 0) | (INPUT_DASH if dash else 0)
+
+def unpack_input(bits):
+    return (bool(bits & INPUT_LEFT), bool(bits & INPUT_RIGHT), bool(bits & INPUT_JUMP), bool(bits & INPUT_DASH))
+
+class Recorder:
+    """Logs the input applied on every simulation step as run-length encoded bitmasks."""
+    def __init__(self, seed, level):
+        self.seed = seed
+        self.level = level
+        self.runs = []
+        self.frames = 0
+
+    def record(self, left, right, jump=False, dash=False):
+        bits = pack_input(left, right, jump, dash)
+        if self.runs and self.runs[-1][0] == bits:
+            self.runs[-1][1] += 1
+        else:
+            self.runs.append([bits, 1])
+        self.frames += 1
+
+    def save(self, path, digest=None):
+        with open(path, 'w') as f:
+            json.dump({'version': REPLAY_VERSION, 'seed': self.seed, 'level': self.level, 'frames': self.frames,
+                       'digest': digest, 'inputs': self.runs}, f, separators=(',', ':'))
+
+class Replay:
+    """A recorded session: the seed and level to start from and one input tuple per simulation step."""
+    def __init__(self, seed, level, inputs, digest=None):
+        self.seed = seed
+        self.level = level
+        self.inputs = inputs
+        self.digest = digest
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if data.get('version') != REPLAY_VERSION:
+            raise ValueError('unsupported replay version: ' + str(data.get('version')))
+        inputs = []
+        for bits, count in data['inputs']:
+            inputs.extend([unpack_input(bits)] * count)
+        return cls(data['seed'], data['level'], inputs, digest=data.get('digest'))
+
+    def __len__(self):
+        return len(self.inputs)
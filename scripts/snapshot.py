@@ -0,0 +1,31 @@
+from scripts.entities import Enemy
+
+class LevelSnapshot:
+    """The pristine state of a level right after it is parsed, so restarting it needs no disk I/O or JSON parsing.
+
+    Tile dicts are shared between the snapshot and the live tilemap; the game never mutates a placed tile,
+    it only adds or removes entries.
+    """
+    def __init__(self, tilemap, player_spawn, enemy_spawns, emitters):
+        self.tilemap = dict(tilemap.tilemap)
+        self.offgrid_tiles = list(tilemap.offgrid_tiles)
+        self.tile_size = tilemap.tile_size
+        self.player_spawn = tuple(player_spawn) if player_spawn else None
+        self.enemy_spawns = [tuple(pos) for pos in enemy_spawns]
+        self.emitters = [(name, tuple(rect)) for name, rect in emitters]
+
+    def used_tile_types(self):
+        return {tile['type'] for tile in self.tilemap.values()} | {tile['type'] for tile in self.offgrid_tiles}
+
+    def restore(self, game):
+        game.tilemap.tilemap = dict(self.tilemap)
+        game.tilemap.offgrid_tiles = list(self.offgrid_tiles)
+        game.tilemap.tile_size = self.tile_size
+        game.tilemap.invalidate()
+        game.emitters.set_areas(self.emitters)
+
+        if self.player_spawn:
+            game.player.pos = list(self.player_spawn)
+            game.player.air_time = 0
+            game.player.health = game.player.max_health
+        game.enemies = [Enemy(game, pos, (8, 15)) for pos in self.enemy_spawns]
@@ -0,0 +1,95 @@
+import json
+import socket
+import sys
+import time
+
+# seconds of play aggregated into each telemetry record
+TELEMETRY_INTERVAL = 1.0
+
+class Counters:
+    """Named event counts from the hot paths, e.g. tile blits or surfaces allocated.
+
+    Call sites check enabled before counting, so while no telemetry is running a counter costs one attribute check.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.values = {}
+
+    def add(self, name, n=1):
+        self.values[name] = self.values.get(name, 0) + n
+
+    def take(self):
+        values = self.values
+        self.values = {}
+        return values
+
+counters = Counters()
+
+def open_sink(target):
+    """A write(line) function and a close() function for 'stdout', 'udp://host:port' or a file path to append to."""
+    if target in ('-', 'stdout'):
+        def write(line):
+            sys.stdout.write(line)
+            sys.stdout.flush()
+        return write, lambda: None
+    if target.startswith('udp://'):
+        host, port = target[len('udp://'):].rsplit(':', 1)
+        address = (host, int(port))
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        return lambda line: sock.sendto(line.encode(), address), sock.close
+    f = open(target, 'a', buffering=1)
+    return f.write, f.close
+
+class Telemetry:
+    """Aggregates the counters and per-frame samples into one JSON line per interval.
+
+    Each record holds the frame time mean, p95 and max, how many frames ran over budget, the counter totals
+    and the mean and peak of each gauge (live entity counts), so slow seconds can be matched to what was on screen.
+    """
+    def __init__(self, target, budget_ms=1000 / 60, interval=TELEMETRY_INTERVAL):
+        self.write, self.close_sink = open_sink(target)
+        self.budget_ms = budget_ms
+        self.interval = interval
+        self.start = time.perf_counter()
+        self.frame_ms = []
+        self.gauges = {}
+        counters.take()
+        counters.enabled = True
+
+    def frame(self, frame_ms, **gauges):
+        self.frame_ms.append(frame_ms)
+        for name, value in gauges.items():
+            gauge = self.gauges.get(name)
+            if gauge:
+                gauge[0] += value
+                gauge[1] = max(gauge[1], value)
+            else:
+                self.gauges[name] = [value, value]
+        now = time.perf_counter()
+        if now - self.start >= self.interval:
+            self.flush(now)
+
+    def flush(self, now=None):
+        now = now or time.perf_counter()
+        frames = len(self.frame_ms)
+        if frames:
+            ordered = sorted(self.frame_ms)
+            record = {
+                'time': round(time.time(), 3),
+                'seconds': round(now - self.start, 3),
+                'frames': frames,
+                'frame_ms': {'mean': round(sum(ordered) / frames, 3), 'p95': round(ordered[int(frames * 0.95)], 3),
+                             'max': round(ordered[-1], 3)},
+                'over_budget': sum(1 for ms in ordered if ms > self.budget_ms),
+                'counters': counters.take(),
+                'gauges': {name: {'mean': round(total / frames, 2), 'max': peak} for name, (total, peak) in self.gauges.items()},
+            }
+            self.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self.start = now
+        self.frame_ms = []
+        self.gauges = {}
+
+    def close(self):
+        self.flush()
+        counters.enabled = False
+        self.close_sink()
@@ -0,0 +1,60 @@
+from collections import OrderedDict
+
+import pygame
+
+from scripts.telemetry import counters
+from scripts.utils import make_surface, convert_surface, SURFACE_ALPHA
+
+# rendered strings kept before the least recently used is dropped
+TEXT_CACHE_SIZE = 256
+
+class TextCache:
+    """Fonts per size and rendered strings, so text that does not change is rasterized once.
+
+    A rendered entry is keyed by everything that affects its pixels: string, font size, colour, scale and shadow.
+    With a shadow, the string is drawn over a copy of itself in the shadow colour one pixel down and right,
+    in a single surface.
+    """
+    def __init__(self, size=TEXT_CACHE_SIZE):
+        self.size = size
+        self.fonts = {}
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, size, name=None):
+        font = self.fonts.get((name, size))
+        if font is None:
+            font = self.fonts[(name, size)] = pygame.font.Font(name, size)
+        return font
+
+    def render(self, text, size, color=(255, 255, 255), scale=1, shadow=None, font=None):
+        key = (text, size, tuple(color), scale, tuple(shadow) if shadow else None, font)
+        surf = self.entries.get(key)
+        if surf is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        if counters.enabled:
+            counters.add('surfaces.text')
+
+        surf = self.rasterize(text, size, color, scale, font)
+        if shadow:
+            shadow_surf = self.rasterize(text, size, shadow, scale, font)
+            combined = make_surface((surf.get_width() + 1, surf.get_height() + 1), SURFACE_ALPHA)
+            combined.blit(shadow_surf, (1, 1))
+            combined.blit(surf, (0, 0))
+            surf = combined
+
+        self.entries[key] = surf
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return surf
+
+    def rasterize(self, text, size, color, scale, font):
+        surf = self.font(size, font).render(text, True, color)
+        if scale != 1:
+            surf = pygame.transform.scale(surf, (int(surf.get_width() * scale), int(surf.get_height() * scale)))
+        # converted once per entry, so every later blit of it takes the fast path
+        return convert_surface(surf, SURFACE_ALPHA)
@@ -1,7 +1,13 @@
 import json
+import math
+import os
 
 import pygame
 
+from scripts.navigation import PatrolTable
+from scripts.occupancy import OccupancyGrid, np
+from scripts.telemetry import counters
+
 AUTOTILE_MAP = {
     tuple(sorted([(1, 0), (0, 1)])): 0,
     tuple(sorted([(1, 0), (0, 1), (-1, 0)])): 1,
@@ -18,12 +24,39 @@ NEIGHBOR_OFFSETS = [(-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (0, 0), (-1, 1)
 PHYSICS_TILES = {'grass', 'stone'}
 AUTOTILE_TILES = {'grass', 'stone'}
 
+# line-of-sight results kept per (from cell, to cell) pair before the cache starts over
+LOS_CACHE_SIZE = 4096
+
+# batch queries smaller than this use the solid set directly; below it numpy's per-call overhead outweighs the loop
+BATCH_THRESHOLD = 8
+
+def write_map(path, data, indent=None, separators=None):
+    # write beside the target and rename over it, so a crash mid-write never leaves a truncated map
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=indent, separators=separators)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 class Tilemap:
     def __init__(self, game, tile_size=16):
         self.game = game
         self.tile_size = tile_size
         self.tilemap = {}
         self.offgrid_tiles = []
+        # optional particle emitters declared by the map, as {'type': name, 'rect': [x, y, w, h]} in pixels
+        self.emitters = []
+        # derived from the grid on first use; edits through set_tile/remove_tile keep them current
+        self.solid = None
+        self.patrol = None
+        self.occupancy = None
+        self.los_cache = {}
         
     def extract(self, id_pairs, keep=False):
         matches = []
@@ -45,6 +78,119 @@ class Tilemap:
                     
         return matches
             
+    def invalidate(self):
+        """Drop the tables derived from the grid after replacing self.tilemap wholesale."""
+        self.solid = None
+        self.patrol = None
+        self.occupancy = None
+        self.los_cache = {}
+
+    def set_tile(self, loc, tile):
+        self.tilemap[loc] = tile
+        self.cell_changed(tile['pos'][0], tile['pos'][1], tile['type'] in PHYSICS_TILES)
+
+    def remove_tile(self, loc):
+        tile = self.tilemap.pop(loc, None)
+        if tile:
+            self.cell_changed(tile['pos'][0], tile['pos'][1], False)
+
+    def cell_changed(self, x, y, solid):
+        if self.solid is not None:
+            if solid:
+                self.solid.add((x, y))
+            else:
+                self.solid.discard((x, y))
+        if self.patrol:
+            self.patrol.update(x, y)
+        if self.occupancy:
+            self.occupancy.set(x, y, solid)
+        self.los_cache.clear()
+
+    def solid_cells(self):
+        if self.solid is None:
+            self.solid = {(tile['pos'][0], tile['pos'][1]) for tile in self.tilemap.values() if tile['type'] in PHYSICS_TILES}
+        return self.solid
+
+    def navigation(self):
+        if not self.patrol:
+            self.patrol = PatrolTable(self.solid_cells())
+        return self.patrol
+
+    def occupancy_grid(self):
+        """The solid cells as a NumPy bitmap, or None when numpy is not installed."""
+        if not self.occupancy and np is not None:
+            self.occupancy = OccupancyGrid(self.solid_cells(), self.tile_size)
+        return self.occupancy
+
+    def solid_at_points(self, points):
+        """Whether each (x, y) pixel position is inside a physics tile; the batch form of solid_check."""
+        if counters.enabled:
+            counters.add('tilemap.solid_points', len(points))
+        if len(points) >= BATCH_THRESHOLD and self.occupancy_grid():
+            return self.occupancy.solid_at(points).tolist()
+        solid = self.solid_cells()
+        return [(int(x // self.tile_size), int(y // self.tile_size)) in solid for x, y in points]
+
+    def any_solid_in_boxes(self, boxes):
+        """Whether each (x, y, w, h) pixel box overlaps a physics tile."""
+        if len(boxes) >= BATCH_THRESHOLD and self.occupancy_grid():
+            return self.occupancy.any_solid_in_boxes(boxes).tolist()
+        solid = self.solid_cells()
+        results = []
+        for x, y, w, h in boxes:
+            cols = range(int(x // self.tile_size), -int(-(x + w) // self.tile_size))
+            rows = range(int(y // self.tile_size), -int(-(y + h) // self.tile_size))
+            results.append(any((col, row) in solid for col in cols for row in rows))
+        return results
+
+    def column_heights(self, xs):
+        """Pixel y of the top of the highest physics tile in the column under each x, or inf when there is none."""
+        if len(xs) >= BATCH_THRESHOLD and self.occupancy_grid():
+            return self.occupancy.column_heights(xs).tolist()
+        tops = {}
+        for col, row in self.solid_cells():
+            if row < tops.get(col, math.inf):
+                tops[col] = row
+        return [tops[col] * self.tile_size if col in tops else math.inf for col in (int(x // self.tile_size) for x in xs)]
+
+    def line_of_sight(self, start, end):
+        """Whether the straight line between the centres of the cells holding start and end crosses no solid tile."""
+        key = (int(start[0] // self.tile_size), int(start[1] // self.tile_size), int(end[0] // self.tile_size), int(end[1] // self.tile_size))
+        visible = self.los_cache.get(key)
+        if visible is None:
+            if len(self.los_cache) >= LOS_CACHE_SIZE:
+                self.los_cache.clear()
+            visible = self.los_cache[key] = self.cast(key[0], key[1], key[2], key[3])
+        return visible
+
+    def cast(self, x0, y0, x1, y1):
+        # grid DDA between cell centres in integer arithmetic: the next x border is (2 * i + 1) / (2 * |dx|) of the
+        # way along the ray and the next y border (2 * j + 1) / (2 * |dy|), compared here cross-multiplied
+        solid = self.solid_cells()
+        dx, dy = abs(x1 - x0), abs(y1 - y0)
+        sx, sy = (1 if x1 > x0 else -1), (1 if y1 > y0 else -1)
+        x, y = x0, y0
+        i = j = 0
+        while (x, y) != (x1, y1):
+            tx, ty = (2 * i + 1) * dy, (2 * j + 1) * dx
+            if tx < ty:
+                x += sx
+                i += 1
+            elif ty < tx:
+                y += sy
+                j += 1
+            else:
+                # passing exactly through a corner: either side blocks
+                if (x + sx, y) in solid or (x, y + sy) in solid:
+                    return False
+                x += sx
+                y += sy
+                i += 1
+                j += 1
+            if (x, y) != (x1, y1) and (x, y) in solid:
+                return False
+        return True
+
     def tiles_around(self, pos):
         tiles = []
         tile_loc = (int(pos[0] // self.tile_size), int(pos[1] // self.tile_size))
@@ -54,10 +200,16 @@ class Tilemap:
                 tiles.append(self.tilemap[check_loc])
         return tiles
     
+    def snapshot(self):
+        """A copy of the map data that later edits (including autotile's in-place variant changes) cannot touch."""
+        data = {'tilemap': {loc: dict(tile) for loc, tile in self.tilemap.items()}, 'tile_size': self.tile_size,
+                'offgrid': [dict(tile) for tile in self.offgrid_tiles]}
+        if self.emitters:
+            data['emitters'] = [dict(emitter) for emitter in self.emitters]
+        return data
+
     def save(self, path):
-        f = open(path, 'w')
-        json.dump({'tilemap': self.tilemap, 'tile_size': self.tile_size, 'offgrid': self.offgrid_tiles}, f)
-        f.close()
+        write_map(path, self.snapshot())
         
     def load(self, path):
         f = open(path, 'r')
@@ -67,14 +219,20 @@ class Tilemap:
         self.tilemap = map_date['tilemap']
         self.tile_size = map_date['tile_size']
         self.offgrid_tiles = map_date['offgrid']
+        self.emitters = map_date.get('emitters', [])
+        self.invalidate()
         
     def solid_check(self, pos):
+        if counters.enabled:
+            counters.add('tilemap.solid_check')
         tile_loc = str(int(pos[0] // self.tile_size)) + ';' + str(int(pos[1] // self.tile_size))
         if tile_loc in self.tilemap:
             if self.tilemap[tile_loc]['type'] in PHYSICS_TILES:
                 return self.tilemap[tile_loc]
     
     def physics_rects_around(self, pos):
+        if counters.enabled:
+            counters.add('tilemap.physics_rects_around')
         rects = []
         for tile in self.tiles_around(pos):
             if tile['type'] in PHYSICS_TILES:
@@ -94,8 +252,17 @@ class Tilemap:
             if (tile['type'] in AUTOTILE_TILES) and (neighbors in AUTOTILE_MAP): 
                 tile['variant'] = AUTOTILE_MAP[neighbors]        
         
-    def render(self, surf, offset=[0, 0]):
-        for tile in self.offgrid_tiles:
+    def offgrid_center(self, tile):
+        size = self.game.assets[tile['type']][tile['variant']].get_size()
+        return (tile['pos'][0] + size[0] / 2, tile['pos'][1] + size[1] / 2)
+
+    def render(self, surf, offset=[0, 0], camera=None):
+        offgrid = self.offgrid_tiles
+        if camera:
+            # culled by image centre: the camera margin covers half of the largest decor, so nothing in view is skipped
+            offgrid = camera.cull('offgrid', offgrid, pos=self.offgrid_center)
+        blits = len(offgrid)
+        for tile in offgrid:
             surf.blit(self.game.assets[tile['type']][tile['variant']], (tile['pos'][0] - offset[0], tile['pos'][1] - offset[1]))
         
         for x in range(offset[0] // self.tile_size, (offset[0] + surf.get_width()) // self.tile_size + 1):
@@ -104,5 +271,8 @@ class Tilemap:
                 if loc in self.tilemap:
                     tile = self.tilemap[loc]
                     surf.blit(self.game.assets[tile['type']][tile['variant']], (tile['pos'][0] * self.tile_size - offset[0], tile['pos'][1] * self.tile_size - offset[1]))
+                    blits += 1
+        if counters.enabled:
+            counters.add('tilemap.blits', blits)
                     
         
\ No newline at end of file
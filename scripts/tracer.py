@@ -0,0 +1,42 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+class StartupTracer:
+    """Records timed spans for each startup phase and writes them as a JSON report.
+
+    Spans marked idle (e.g. waiting on the title screen) are excluded from the active total.
+    """
+    def __init__(self, start=None):
+        self.start = start if start is not None else time.perf_counter()
+        self.spans = []
+        self.finished = False
+
+    def record(self, name, start, end=None, idle=False):
+        end = end if end is not None else time.perf_counter()
+        self.spans.append({'name': name, 'start': (start - self.start) * 1000, 'duration': (end - start) * 1000, 'idle': idle})
+
+    @contextmanager
+    def span(self, name, idle=False):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, idle=idle)
+
+    def report(self):
+        wall = (time.perf_counter() - self.start) * 1000
+        phases = {}
+        for span in self.spans:
+            phases[span['name']] = phases.get(span['name'], 0) + span['duration']
+        idle = sum(span['duration'] for span in self.spans if span['idle'])
+        return {'wall_ms': wall, 'active_ms': wall - idle, 'phases_ms': phases, 'spans': self.spans}
+
+    def write(self, path):
+        self.finished = True
+        report = self.report()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        return report
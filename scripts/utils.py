@@ -2,17 +2,53 @@ import os
 
 import pygame
 
+from scripts.telemetry import counters
+
 BASE_IMG_PATH = 'data/images/'
 
-def load_image(path):
-    img = pygame.image.load(BASE_IMG_PATH + path).convert()
-    img.set_colorkey((0, 0, 0))
-    return img
+COLORKEY = (0, 0, 0)
+
+# pixel format roles every surface in the pipeline is created or converted into
+SURFACE_OPAQUE = 'opaque'
+SURFACE_COLORKEY = 'colorkey'
+SURFACE_ALPHA = 'alpha'
+
+def make_surface(size, role=SURFACE_OPAQUE):
+    if counters.enabled:
+        counters.add('surfaces.alloc')
+    # created straight in the display's format; converting a fresh surface costs a full extra copy
+    display = pygame.display.get_surface()
+    if role == SURFACE_ALPHA:
+        return pygame.Surface(size, pygame.SRCALPHA, display) if display else pygame.Surface(size, pygame.SRCALPHA)
+    surf = pygame.Surface(size, 0, display) if display else pygame.Surface(size)
+    if role == SURFACE_COLORKEY:
+        surf.set_colorkey(COLORKEY, pygame.RLEACCEL)
+    return surf
+
+def convert_surface(surf, role=SURFACE_COLORKEY, rle=True):
+    if role == SURFACE_ALPHA:
+        return surf.convert_alpha()
+    surf = surf.convert()
+    if role == SURFACE_COLORKEY:
+        # RLE makes static colorkey blits cheap but every lock (flip, scale, mask) re-encodes the surface
+        surf.set_colorkey(COLORKEY, pygame.RLEACCEL if rle else 0)
+    return surf
+
+def blit_path(src, dst):
+    """Return why blitting src onto dst can't use SDL's same-format fast path, or None."""
+    if src.get_bitsize() != dst.get_bitsize() or src.get_masks()[:3] != dst.get_masks()[:3]:
+        return 'converts %dbpp %s to %dbpp %s' % (src.get_bitsize(), src.get_masks(), dst.get_bitsize(), dst.get_masks())
+    if src.get_flags() & pygame.SRCALPHA and not dst.get_flags() & pygame.SRCALPHA:
+        return 'blends per-pixel alpha onto an opaque target'
+    return None
+
+def load_image(path, role=SURFACE_COLORKEY, rle=True):
+    return convert_surface(pygame.image.load(BASE_IMG_PATH + path), role, rle=rle)
 
-def load_images(path): 
+def load_images(path, role=SURFACE_COLORKEY, rle=True):
     images = []
     for img_name in sorted(os.listdir(BASE_IMG_PATH + path)):
-        images.append(load_image(path + '/' + img_name))
+        images.append(load_image(path + '/' + img_name, role, rle=rle))
     return images
 
 class Animation:
@@ -0,0 +1,18 @@
+"""Setup shared by the command-line tools in this directory.
+
+Importing it makes the repository root the working directory and puts it on the import path, so a tool
+can import game and scripts modules however it was launched.
+"""
+import multiprocessing
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+# SDL turns SIGTERM into a quit event, which would keep a pool from terminating its workers; workers inherit this
+os.environ.setdefault('SDL_NO_SIGNAL_HANDLERS', '1')
+
+def worker_pool(workers):
+    return multiprocessing.Pool(workers)
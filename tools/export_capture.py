@@ -0,0 +1,57 @@
+"""Export a gameplay capture (game.py --capture, or F5 in game) to a numbered PNG sequence.
+
+Run from the repository root:
+
+    python tools/export_capture.py capture.plcap [--out-dir DIR] [--scale N] [--every N] [--start N] [--end N]
+
+Files are named by the frame number they were grabbed at, so gaps in the sequence show frames that
+were dropped while the writer was behind.
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+
+from scripts.capture import read_capture
+
+def main():
+    parser = argparse.ArgumentParser(description='Export a gameplay capture to PNG images')
+    parser.add_argument('capture', help='capture file to export')
+    parser.add_argument('--out-dir', help='directory for the images (default: the capture path without its extension)')
+    parser.add_argument('--scale', type=int, default=1, help='integer upscale factor for the images')
+    parser.add_argument('--every', type=int, default=1, help='keep one stored frame in N')
+    parser.add_argument('--start', type=int, default=0, help='first frame number to export')
+    parser.add_argument('--end', type=int, help='last frame number to export')
+    args = parser.parse_args()
+
+    out_dir = args.out_dir or os.path.splitext(args.capture)[0]
+    os.makedirs(out_dir, exist_ok=True)
+    size, frames = read_capture(args.capture)
+
+    exported = stored = 0
+    last = None
+    for frame, ms, pixels in frames:
+        if args.end is not None and frame > args.end:
+            break
+        if frame < args.start:
+            continue
+        stored += 1
+        last = frame
+        if (stored - 1) % args.every:
+            continue
+        image = pygame.image.frombytes(pixels, size, 'RGB')
+        if args.scale > 1:
+            image = pygame.transform.scale(image, (size[0] * args.scale, size[1] * args.scale))
+        pygame.image.save(image, os.path.join(out_dir, 'frame-%06d.png' % frame))
+        exported += 1
+
+    missing = (last - args.start + 1 - stored) if last is not None else 0
+    print('exported %d of %d stored frames to %s (%d dropped during capture)' % (exported, stored, out_dir, max(0, missing)))
+
+if __name__ == '__main__':
+    main()
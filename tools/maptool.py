@@ -0,0 +1,212 @@
+"""Process map files headless and in parallel: autotile, validate, normalize and convert.
+
+Run from the repository root:
+
+    python tools/maptool.py [PATH ...] [--autotile] [--validate] [--normalize] [--format json|json-compact|json-pretty|csv]
+                            [--in-place | --out-dir DIR] [--check] [--workers N] [--report report.json]
+
+PATH is a map file or a directory of them (default: data/maps). Without --in-place or --out-dir
+nothing is written, which together with --check makes a CI gate: the run exits with status 1 when a
+map has validation errors or would change.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from collections import deque
+
+from common import worker_pool
+
+from scripts.emitters import area_errors
+from scripts.tilemap import Tilemap, PHYSICS_TILES, write_map
+
+TILES_PATH = 'data/images/tiles'
+FORMATS = {'json': '.json', 'json-compact': '.json', 'json-pretty': '.json', 'csv': '.csv'}
+# json.dump arguments per json format; plain json is what Tilemap.save writes, so maps the game or editor saved are unchanged
+JSON_LAYOUTS = {'json': {}, 'json-compact': {'separators': (',', ':')}, 'json-pretty': {'indent': 2}}
+
+# how far below a spawner the validator looks for ground before deciding it falls out of the level
+FALL_LIMIT = 64
+
+def tile_variants():
+    """Number of variants of every tile type, from the images on disk."""
+    return {name: len([f for f in os.listdir(os.path.join(TILES_PATH, name)) if f.endswith('.png')])
+            for name in sorted(os.listdir(TILES_PATH)) if os.path.isdir(os.path.join(TILES_PATH, name))}
+
+def normalize(tilemap):
+    """Re-key every grid tile by its position, use integer grid positions and order tiles by row then column."""
+    tiles = {}
+    for tile in tilemap.tilemap.values():
+        pos = [int(tile['pos'][0]), int(tile['pos'][1])]
+        tiles[(pos[1], pos[0])] = {'type': tile['type'], 'variant': int(tile['variant']), 'pos': pos}
+    tilemap.tilemap = {str(x) + ';' + str(y): tiles[(y, x)] for y, x in sorted(tiles)}
+    tilemap.offgrid_tiles = sorted(({'type': tile['type'], 'variant': int(tile['variant']), 'pos': [round(tile['pos'][0], 2), round(tile['pos'][1], 2)]}
+                                    for tile in tilemap.offgrid_tiles), key=lambda tile: (tile['pos'][1], tile['pos'][0], tile['type']))
+
+def validate(tilemap, variants):
+    errors = []
+    for loc, tile in tilemap.tilemap.items():
+        if loc != str(tile['pos'][0]) + ';' + str(tile['pos'][1]):
+            errors.append('tile at %s is keyed as %s' % (tile['pos'], loc))
+    for tile in list(tilemap.tilemap.values()) + tilemap.offgrid_tiles:
+        if tile['type'] not in variants:
+            errors.append('unknown tile type %r at %s' % (tile['type'], tile['pos']))
+        elif not 0 <= tile['variant'] < variants[tile['type']]:
+            errors.append('unknown %s variant %r at %s' % (tile['type'], tile['variant'], tile['pos']))
+    errors += area_errors(tilemap.emitters)
+
+    # spawners can be placed on or off the grid; offgrid positions are in pixels
+    spawners = [(tile['variant'], (tile['pos'][0], tile['pos'][1])) for tile in tilemap.tilemap.values() if tile['type'] == 'spawners']
+    spawners += [(tile['variant'], (int(tile['pos'][0] // tilemap.tile_size), int(tile['pos'][1] // tilemap.tile_size)))
+                 for tile in tilemap.offgrid_tiles if tile['type'] == 'spawners']
+    players = [pos for variant, pos in spawners if variant == 0]
+    enemies = [pos for variant, pos in spawners if variant == 1]
+    if not players:
+        errors.append('no player spawner')
+        return errors
+    if len(players) > 1:
+        errors.append('%d player spawners, the last one wins' % len(players))
+    if not enemies:
+        errors.append('no enemy spawners, the level is cleared immediately')
+
+    solid = {tuple(tile['pos']) for tile in tilemap.tilemap.values() if tile['type'] in PHYSICS_TILES}
+    for kind, pos in [('player', players[-1])] + [('enemy', pos) for pos in enemies]:
+        if pos in solid:
+            errors.append('%s spawner at %s is inside a solid tile' % (kind, list(pos)))
+        elif not any((pos[0], pos[1] + dy) in solid for dy in range(1, FALL_LIMIT)):
+            errors.append('%s spawner at %s has no ground below it' % (kind, list(pos)))
+
+    # an enemy sealed off from the player by solid tiles can never be killed, so the level never ends
+    xs = [pos[0] for pos in solid] + [players[-1][0]]
+    ys = [pos[1] for pos in solid] + [players[-1][1]]
+    bounds = (min(xs) - 2, min(ys) - 2, max(xs) + 2, max(ys) + 2)
+    reached = {players[-1]}
+    frontier = deque(reached)
+    while frontier:
+        x, y = frontier.popleft()
+        for cell in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if cell not in reached and cell not in solid and bounds[0] <= cell[0] <= bounds[2] and bounds[1] <= cell[1] <= bounds[3]:
+                reached.add(cell)
+                frontier.append(cell)
+    for pos in enemies:
+        if pos not in reached:
+            errors.append('enemy spawner at %s is unreachable from the player' % list(pos))
+    return errors
+
+def encode(tilemap, fmt):
+    if fmt == 'csv':
+        lines = ['layer,type,variant,x,y']
+        lines += ['grid,%s,%d,%d,%d' % (tile['type'], tile['variant'], tile['pos'][0], tile['pos'][1]) for tile in tilemap.tilemap.values()]
+        lines += ['offgrid,%s,%d,%s,%s' % (tile['type'], tile['variant'], tile['pos'][0], tile['pos'][1]) for tile in tilemap.offgrid_tiles]
+        return '\n'.join(lines) + '\n'
+    return json.dumps(tilemap.snapshot(), **JSON_LAYOUTS[fmt])
+
+def process(job):
+    path, options = job
+    result = {'path': path}
+    try:
+        with open(path, 'r') as f:
+            original = f.read()
+        tilemap = Tilemap(None)
+        tilemap.load(path)
+        result['tiles'] = len(tilemap.tilemap)
+        result['offgrid'] = len(tilemap.offgrid_tiles)
+
+        if options['autotile']:
+            before = {loc: tile['variant'] for loc, tile in tilemap.tilemap.items()}
+            tilemap.autotile()
+            result['autotiled'] = sum(1 for loc, tile in tilemap.tilemap.items() if tile['variant'] != before[loc])
+        if options['normalize']:
+            normalize(tilemap)
+        if options['validate']:
+            result['errors'] = validate(tilemap, options['variants'])
+
+        fmt = options['format']
+        output = encode(tilemap, fmt)
+        result['bytes'] = (len(original), len(output))
+        result['changed'] = fmt == 'csv' or output != original
+
+        out_path = None
+        if options['in_place']:
+            out_path = os.path.splitext(path)[0] + FORMATS[fmt]
+        elif options['out_dir']:
+            out_path = os.path.join(options['out_dir'], os.path.splitext(os.path.basename(path))[0] + FORMATS[fmt])
+        if out_path and (result['changed'] or out_path != path):
+            if fmt == 'csv':
+                with open(out_path + '.tmp', 'w') as f:
+                    f.write(output)
+                os.replace(out_path + '.tmp', out_path)
+            else:
+                write_map(out_path, tilemap.snapshot(), **JSON_LAYOUTS[fmt])
+            result['written'] = out_path
+    except Exception:
+        result['error'] = traceback.format_exc()
+    return result
+
+def collect(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.json'))
+        else:
+            files.append(path)
+    return files
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch-process map files.')
+    parser.add_argument('paths', nargs='*', default=['data/maps'], metavar='PATH')
+    parser.add_argument('--autotile', action='store_true', help='recompute grass and stone variants from their neighbours')
+    parser.add_argument('--validate', action='store_true', help='check tile types, variants, emitters, spawners and reachability')
+    parser.add_argument('--normalize', action='store_true', help='re-key tiles by position and sort them')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='json', help='output format (default: json as the game saves it)')
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('--in-place', action='store_true', help='rewrite each map where it is')
+    output.add_argument('--out-dir', metavar='DIR', help='write processed maps to DIR')
+    parser.add_argument('--check', action='store_true', help='exit with status 1 if a map has errors or would change')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--report', metavar='PATH', help='write the summary report as JSON')
+    args = parser.parse_args()
+
+    files = collect(args.paths)
+    if not files:
+        parser.error('no map files found')
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+    options = {'autotile': args.autotile, 'validate': args.validate, 'normalize': args.normalize, 'format': args.format,
+               'in_place': args.in_place, 'out_dir': args.out_dir, 'variants': tile_variants()}
+
+    start = time.perf_counter()
+    workers = max(1, min(args.workers, len(files)))
+    with worker_pool(workers) as pool:
+        results = pool.map(process, [(path, options) for path in files])
+        pool.close()
+        pool.join()
+
+    failed = False
+    for result in results:
+        if 'error' in result:
+            print('%s: failed\n%s' % (result['path'], result['error']))
+            failed = True
+            continue
+        notes = ['%d tiles' % result['tiles'], '%d offgrid' % result['offgrid'], '%d -> %d bytes' % result['bytes']]
+        if 'autotiled' in result:
+            notes.append('%d autotiled' % result['autotiled'])
+        if result['changed']:
+            notes.append('written to ' + result['written'] if 'written' in result else 'would change')
+        print('%s: %s' % (result['path'], ', '.join(notes)))
+        for error in result.get('errors', []):
+            print('    ' + error)
+        if args.check and (result.get('errors') or (result['changed'] and 'written' not in result)):
+            failed = True
+    print('%d maps on %d workers in %.2f s' % (len(results), workers, time.perf_counter() - start))
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'maps': results}, f, indent=2)
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
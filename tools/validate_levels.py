@@ -0,0 +1,180 @@
+"""Validate levels by simulating them headless in parallel across a process pool.
+
+Run from the repository root:
+
+    python tools/validate_levels.py [--map N ...] [--seeds 8] [--policy NAME ...] [--frames 7200]
+                                    [--workers N] [--output report.json] [--gate]
+
+Every combination of map, seed and input policy is one job. A job loads the map into a fresh
+headless Game and steps it until the map is cleared or the frame limit is reached, collecting
+completion, deaths, frame times and peak entity counts. With --gate the run exits with status 1
+when a map is never cleared or a job raises.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import traceback
+from collections import deque
+
+from common import worker_pool
+from scripts.profiler import percentiles
+
+def idle_policy(seed):
+    def inputs(game, frame):
+        return (False, False, False, False)
+    return inputs
+
+def random_policy(seed):
+    rng = random.Random(seed)
+    def inputs(game, frame):
+        return (rng.random() < 0.3, rng.random() < 0.5, rng.random() < 0.05, rng.random() < 0.02)
+    return inputs
+
+def walker_policy(seed):
+    """Walks one way for a while, then turns, jumping and dashing now and then."""
+    rng = random.Random(seed)
+    state = {'direction': 1, 'turn': rng.randint(60, 300)}
+    def inputs(game, frame):
+        if frame >= state['turn']:
+            state['direction'] = -state['direction']
+            state['turn'] = frame + rng.randint(60, 300)
+        return (state['direction'] < 0, state['direction'] > 0, rng.random() < 0.04, rng.random() < 0.01)
+    return inputs
+
+def hunter_policy(seed):
+    """Heads for the nearest enemy, jumping over walls, and dashes through it once level and in range."""
+    rng = random.Random(seed)
+    def inputs(game, frame):
+        if not game.enemies:
+            return (False, False, False, False)
+        player = game.player.rect().center
+        target = min(game.enemies, key=lambda enemy: abs(enemy.rect().centerx - player[0]) + abs(enemy.rect().centery - player[1]))
+        dx = target.rect().centerx - player[0]
+        dy = target.rect().centery - player[1]
+        blocked = game.player.collisions['left'] or game.player.collisions['right']
+        jump = blocked or dy < -24 or rng.random() < 0.01
+        dash = abs(dx) < 60 and abs(dy) < 12 and (dx > 0) == (not game.player.flip)
+        return (dx < -4, dx > 4, jump, dash)
+    return inputs
+
+POLICIES = {
+    'hunter': hunter_policy,
+    'idle': idle_policy,
+    'random': random_policy,
+    'walker': walker_policy,
+}
+
+def run_job(job):
+    map_id, seed, policy, frames = job
+    result = {'map': map_id, 'seed': seed, 'policy': policy}
+    try:
+        from game import Game
+
+        game = Game(headless=True, level=map_id, seed=seed, profile=True)
+        game.profiler.frames = deque(maxlen=frames)
+        game.load_level(map_id)
+        result['enemies'] = len(game.enemies)
+
+        peaks = {'enemies': 0, 'projectiles': 0, 'particles': 0, 'sparks': 0}
+        policy_inputs = POLICIES[policy](seed)
+        def inputs(game, frame):
+            peaks['enemies'] = max(peaks['enemies'], len(game.enemies))
+            peaks['projectiles'] = max(peaks['projectiles'], len(game.projectiles))
+            peaks['particles'] = max(peaks['particles'], len(game.particles))
+            peaks['sparks'] = max(peaks['sparks'], len(game.sparks))
+            return policy_inputs(game, frame)
+
+        start = time.perf_counter()
+        stepped = game.simulate(frames, inputs=inputs, until=lambda game: game.level != map_id)
+        result.update({
+            'completed': game.completed or game.level != map_id,
+            'frames': stepped,
+            'deaths': game.deaths,
+            'enemies_left': len(game.enemies) if game.level == map_id else 0,
+            'elapsed_s': time.perf_counter() - start,
+            'frame_ms': percentiles([frame['frame'] for frame in game.profiler.frames]),
+            'peaks': peaks,
+        })
+    except Exception:
+        result['error'] = traceback.format_exc()
+    return result
+
+def summarize(results):
+    maps = {}
+    for result in results:
+        maps.setdefault(result['map'], []).append(result)
+    summary = {}
+    for map_id, jobs in sorted(maps.items()):
+        ok = [job for job in jobs if 'error' not in job]
+        cleared = [job for job in ok if job['completed']]
+        summary[map_id] = {
+            'jobs': len(jobs),
+            'errors': len(jobs) - len(ok),
+            'completed': len(cleared),
+            'mean_deaths': statistics.fmean(job['deaths'] for job in ok) if ok else None,
+            'mean_clear_frames': statistics.fmean(job['frames'] for job in cleared) if cleared else None,
+            'frame_ms_p95': max(job['frame_ms']['p95'] for job in ok) if ok else None,
+            'frame_ms_max': max(job['frame_ms']['max'] for job in ok) if ok else None,
+            'peaks': {name: max(job['peaks'][name] for job in ok) for name in ok[0]['peaks']} if ok else {},
+        }
+    return summary
+
+def main():
+    maps = sorted(int(name.split('.')[0]) for name in os.listdir('data/maps') if name.endswith('.json'))
+
+    parser = argparse.ArgumentParser(description='Validate levels with parallel headless simulations.')
+    parser.add_argument('--map', type=int, action='append', choices=maps, help='map to validate (default: all)')
+    parser.add_argument('--seeds', type=int, default=8, help='seeds per map and policy')
+    parser.add_argument('--first-seed', type=int, default=0)
+    parser.add_argument('--policy', action='append', choices=sorted(POLICIES), help='input policy (default: all)')
+    parser.add_argument('--frames', type=int, default=7200, help='frame limit per job')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--output', metavar='PATH', help='write the report as JSON')
+    parser.add_argument('--gate', action='store_true', help='exit with status 1 if a map is never cleared or a job fails')
+    args = parser.parse_args()
+
+    jobs = [(map_id, seed, policy, args.frames)
+            for map_id in args.map or maps
+            for seed in range(args.first_seed, args.first_seed + args.seeds)
+            for policy in args.policy or sorted(POLICIES)]
+
+    start = time.perf_counter()
+    results = []
+    with worker_pool(min(args.workers, len(jobs))) as pool:
+        for result in pool.imap_unordered(run_job, jobs):
+            results.append(result)
+            if 'error' in result:
+                print('map %d seed %d %s failed:\n%s' % (result['map'], result['seed'], result['policy'], result['error']))
+        pool.close()
+        pool.join()
+    results.sort(key=lambda result: (result['map'], result['policy'], result['seed']))
+    summary = summarize(results)
+
+    print('%d jobs on %d workers in %.1f s' % (len(jobs), min(args.workers, len(jobs)), time.perf_counter() - start))
+    for map_id, stats in summary.items():
+        print('map %-3d cleared %3d/%-3d errors %-2d deaths %5s  frame p95 %6s ms  max %6s ms  peak particles %d'
+              % (map_id, stats['completed'], stats['jobs'], stats['errors'],
+                 '%.1f' % stats['mean_deaths'] if stats['mean_deaths'] is not None else '-',
+                 '%.2f' % stats['frame_ms_p95'] if stats['frame_ms_p95'] is not None else '-',
+                 '%.2f' % stats['frame_ms_max'] if stats['frame_ms_max'] is not None else '-',
+                 stats['peaks'].get('particles', 0)))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': {'python': platform.python_version(), 'platform': platform.platform(),
+                                'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'frames': args.frames},
+                       'summary': summary, 'jobs': results}, f, indent=2)
+
+    if args.gate:
+        failed = [map_id for map_id, stats in summary.items() if stats['errors'] or not stats['completed']]
+        if failed:
+            print('gate failed for maps: ' + ', '.join(str(map_id) for map_id in failed))
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()